@@ -12,8 +12,8 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # === Imports ===
 from math import inf
 
-from agent.control import possible_moves, first_move
-from agent.gamestate import Gamestate
+from agent.control import first_move
+from agent.bitgamestate import BitGamestate
 from agent.heuristics import *
 from agent.valwrap import ValWrap
 
@@ -40,7 +40,7 @@ class Agent:
         """
         self.first_move =True
         self.color = color
-        self.game = Gamestate()
+        self.game = BitGamestate()
 
     def action(self, **referee: dict) -> Action:
         """
@@ -66,7 +66,8 @@ class Agent:
         self.game.move(action, color)
 
 
-def ab(game: Gamestate, player: PlayerColor, depth: int, heu) -> Action | None:
+def ab(game: BitGamestate, player: PlayerColor, depth: int, 
+       heu) -> Action | None:
     """The origin point for an alpha-beta pruning minimax approach to searching
     through next possible moves for a gamestate `agt.game`. Remaining max 
     recursions are determined from `depth`, and bottom nodes are evaluated 
@@ -79,8 +80,9 @@ def ab(game: Gamestate, player: PlayerColor, depth: int, heu) -> Action | None:
     b = ValWrap(inf, None)
     return sub_ab(True, game, None, player, depth, heu, a, b).item
 
-def sub_ab(max_flag: bool, game: Gamestate, move: Action, player: PlayerColor, 
-           depth: int, heu, a: ValWrap, b: ValWrap) -> ValWrap:
+def sub_ab(max_flag: bool, game: BitGamestate, move: Action, 
+           player: PlayerColor, depth: int, heu, a: ValWrap, 
+           b: ValWrap) -> ValWrap:
     """ab() sub-function. Maximises or minimises outcome depending on 
     alternating depth level. Equivalent to ab_max if `max_flag` is set to True, 
     ab_min if set to False. Returns a ValWrap-ed Action."""
@@ -97,7 +99,7 @@ def sub_ab(max_flag: bool, game: Gamestate, move: Action, player: PlayerColor,
 
     else: 
         # Find next level of the tree of possible states
-        next_moves = possible_moves(game.board, game.current)
+        next_moves = game.legal_moves(game.current)
         # If no moves remaining, reflect this WIN/LOSS from player's perspective
         if len(next_moves) == 0:
             if game.current == player: return ValWrap(LOSS, move)
@@ -106,17 +108,20 @@ def sub_ab(max_flag: bool, game: Gamestate, move: Action, player: PlayerColor,
 
         # Otherwise, proceed with max/min value search depending on turn
         for p in next_moves:
-            s = game.child(p,game.current)
+            # Walk down the tree in place, reverting move once searched
+            game.push(p)
             m = p if (move == None) else move
 
             # Update maximum possible outcome if flag true
             if max_flag:
-                a = max(a, sub_ab(False, s, m, player, depth-1, heu, a, b))
-                if a.val >= b.val: return b
+                a = max(a, sub_ab(False, game, m, player, depth-1, heu, a, b))
             # Update minimum possible outcome if flag false
             else:
-                b =  min(b, sub_ab(True, s, m, player, depth-1, heu, a, b))
-                if b.val <= a.val: return a
+                b = min(b, sub_ab(True, game, m, player, depth-1, heu, a, b))
+            game.pop()
+
+            if max_flag and a.val >= b.val: return b
+            if not max_flag and b.val <= a.val: return a
 
         # Return a / b if no turnover
         if max_flag: return a
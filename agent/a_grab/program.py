@@ -14,12 +14,13 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # === Imports ===
 from math import inf
 
-from agent.control import first_move, possible_moves
-from agent.gamestate import Gamestate, flatten_board
+from agent.control import first_move
+from agent.bitgamestate import BitGamestate
 from agent.heuristics import *
+from agent.transposition import EXACT, LOWER, UPPER, TranspositionTable
 from agent.valwrap import ValWrap
 
-from referee.game import Action, PlayerColor, MAX_TURNS
+from referee.game import Action, PlaceAction, PlayerColor, MAX_TURNS
 
 # === Constants ===
 WIN = 10000
@@ -34,7 +35,7 @@ class Agent:
     """
     first_move: bool
     color: PlayerColor
-    seen: dict[str: list[Action]]
+    tt: TranspositionTable              # search results, by Gamestate hash
 
     def __init__(self, color: PlayerColor, **referee: dict):
         """
@@ -43,8 +44,8 @@ class Agent:
         """
         self.first_move =True
         self.color = color
-        self.game = Gamestate()
-        self.seen = {}
+        self.game = BitGamestate()
+        self.tt = TranspositionTable()
 
     def action(self, **referee: dict) -> Action:
         """
@@ -58,7 +59,7 @@ class Agent:
         
         else:
             # Intelligently select next move if few remaning possible moves
-            moves = possible_moves(self.game.board, self.color)
+            moves = self.game.legal_moves(self.color)
             # above calculation is doubled up at times, but << efficiency change
 
             if len(moves) < THRESHOLD:
@@ -76,11 +77,10 @@ class Agent:
         # There is only one action type, PlaceAction. 
         # Clear filled lines as necessary.
         self.game.move(action, color)
+        # Transposition table is of fixed size - no clearing of past states
 
-        # Could implement a method to clear past seen to free space here...
 
-
-def greedy(game: Gamestate, player: PlayerColor, 
+def greedy(game: BitGamestate, player: PlayerColor, 
            moves: list[Action]) -> Action:
     """Greedy search with heuristics. Searches through a precalculated list of 
     possible next moves `moves` and returns the most promising move according
@@ -91,9 +91,10 @@ def greedy(game: Gamestate, player: PlayerColor,
     h_combined = h_combiner([(h1, 1/8), (h3, 1)])
 
     for move in moves:
-        child = game.child(move, player)
-        # h = multi_h([(h1, 1/8), (h3, 1)], child, self.color)
-        h = h_combined(child, player)
+        # Evaluate move in place, reverting it after
+        game.push(move)
+        h = h_combined(game, player)
+        game.pop()
         # Maximise h here
         if h > best:
             best = h
@@ -114,8 +115,9 @@ def ab(agt: Agent, depth: int, heu) -> Action | None:
     b = ValWrap(inf, None)
     return sub_ab(True, agt.game, None, agt.color, depth, heu, agt, a, b).item
 
-def sub_ab(max_flag: bool, game: Gamestate, move: Action, player: PlayerColor, 
-           depth: int, heu, agt: Agent, a: ValWrap, b: ValWrap) -> ValWrap:
+def sub_ab(max_flag: bool, game: BitGamestate, move: Action, 
+           player: PlayerColor, depth: int, heu, agt: Agent, a: ValWrap, 
+           b: ValWrap) -> ValWrap:
     """ab() sub-function. Maximises or minimises outcome depending on 
     alternating depth level. Equivalent to ab_max if `max_flag` is set to True, 
     ab_min if set to False. Returns a ValWrap-ed Action."""
@@ -131,12 +133,19 @@ def sub_ab(max_flag: bool, game: Gamestate, move: Action, player: PlayerColor,
         else: return ValWrap(LOSS, move)
 
     else: 
+        # Reuse an earlier search of this state if deep enough - except at the
+        # root, where a move must still be found
+        entry = agt.tt.probe(game.hash)
+        hash_move = None
+        if entry is not None:
+            (tt_depth, score, bound, hash_move) = entry
+            if tt_depth >= depth and move != None:
+                if bound == EXACT: return ValWrap(score, move)
+                if bound == LOWER and score >= b.val: return b
+                if bound == UPPER and score <= a.val: return a
+
         # Find next level of the tree of possible states
-        flat_b = flatten_board(game.board)
-        # Avoid recalculating possible moves by storing game state in `seen`
-        if flat_b not in agt.seen: 
-            agt.seen[flat_b] = possible_moves(game.board, game.current)
-        next_moves = agt.seen[flat_b]
+        next_moves = game.legal_moves(game.current)
 
         # If no moves remaining, reflect this WIN/LOSS from player's perspective
         if len(next_moves) == 0:
@@ -148,21 +157,45 @@ def sub_ab(max_flag: bool, game: Gamestate, move: Action, player: PlayerColor,
         elif (len(next_moves) > 5 * THRESHOLD * depth) and (move != None):
             return ValWrap(heu(game, player), move)
 
+        # Search best move of an earlier search first (if not a hash collision)
+        if hash_move is not None and hash_move in game.legal[game.current]:
+            first = PlaceAction.from_id(hash_move)
+            next_moves.remove(first)
+            next_moves.insert(0, first)
 
         # Otherwise, proceed with max/min value search depending on turn
+        a_val, b_val = a.val, b.val
+        best = None
         for p in next_moves:
-            s = game.child(p,game.current)
+            # Walk down the tree in place, reverting move once searched
+            game.push(p)
             m = p if (move == None) else move
 
             # Update maximum possible outcome if flag true
             if max_flag:
-                a = max(a, sub_ab(False, s, m, player, depth-1, heu, agt, a, b))
-                if a.val >= b.val: return b
+                s = sub_ab(False, game, m, player, depth-1, heu, agt, a, b)
+                if s > a: a, best = s, p
             # Update minimum possible outcome if flag false
             else:
-                b =  min(b, sub_ab(True, s, m, player, depth-1, heu, agt, a, b))
-                if b.val <= a.val: return a
-
-        # Return a / b if no turnover
-        if max_flag: return a
-        else: return b
+                s = sub_ab(True, game, m, player, depth-1, heu, agt, a, b)
+                if s < b: b, best = s, p
+            game.pop()
+
+            if max_flag and a.val >= b.val: 
+                agt.tt.store(game.hash, depth, a.val, LOWER, p.id)
+                return b
+            if not max_flag and b.val <= a.val: 
+                agt.tt.store(game.hash, depth, b.val, UPPER, p.id)
+                return a
+
+        # Return a / b if no turnover, storing whether either was improved on
+        if max_flag: 
+            if best is None: 
+                agt.tt.store(game.hash, depth, a_val, UPPER, None)
+            else: agt.tt.store(game.hash, depth, a.val, EXACT, best.id)
+            return a
+        else: 
+            if best is None: 
+                agt.tt.store(game.hash, depth, b_val, LOWER, None)
+            else: agt.tt.store(game.hash, depth, b.val, EXACT, best.id)
+            return b
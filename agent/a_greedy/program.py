@@ -9,8 +9,8 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # Project Part B: Game Playing Agent
 
 # === Imports ===
-from agent.control import first_move, possible_moves
-from agent.gamestate import Gamestate
+from agent.control import first_move
+from agent.bitgamestate import BitGamestate
 from agent.heuristics import *
 from agent.prioritydict import PriorityDict
 
@@ -32,7 +32,7 @@ class Agent:
         """
         self.first_move = True
         self.color = color
-        self.game = Gamestate()
+        self.game = BitGamestate()
 
     def action(self, **referee: dict) -> Action:
         """
@@ -47,9 +47,10 @@ class Agent:
         else:
             # Generate all possible next moves, greedy pick based on heuristic
             pd = PriorityDict()
-            for move in possible_moves(self.game.board, self.color):
-                child = self.game.child(move, self.color)
-                h = -h3(child, self.color)  # Inverting for use in Priority Dict
+            for move in self.game.legal_moves(self.color):
+                self.game.push(move)
+                h = -h3(self.game, self.color)  # Inverting for Priority Dict
+                self.game.pop()
                 pd.put(h, move)
             return pd.get()
 
@@ -2,7 +2,8 @@ from __future__ import annotations
 """program.py: Supplies an `Agent` class to play Tetress in competition with 
 another agent. Managed by the referee module.
 Agent selects next move via a Monte Carlo Tree Search algorithm paired to find 
-next optimal move."""
+next optimal move - optionally growing independent trees in several worker 
+processes and merging their root statistics."""
 
 __author__ = "Liam Anthian, and Anthony Hill"
 __credits__ = ["Liam Anthian", "Anthony Hill"] 
@@ -11,19 +12,34 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # Project Part B: Game Playing Agent
 
 # === Imports ===
+from concurrent.futures import ProcessPoolExecutor
 from math import inf, log, sqrt
-from random import choice
+from multiprocessing import get_context
+from random import seed
+from sys import stderr
+from time import perf_counter, process_time
 
-from agent.control import first_move, possible_moves
-from agent.gamestate import Gamestate, flatten_board
+from agent.control import first_move, turn_time_slice
+from agent.bitgamestate import BitGamestate
 from agent.heuristics import *
+from agent.placements import PLACEMENTS
+from agent.playout import GreedyPolicy, RandomPolicy, playout
 from agent.valwrap import ValWrap
+from agent.a_mcts.tree import LOSS, NONE, ROOT, WIN, Tree
 
-from referee.game import Action, PlaceAction, PlayerColor, MAX_TURNS
+from referee.game import Action, PlayerColor, MAX_TURNS
 
 # === Constants ===
-ITERATIONS = 10
+ITERATIONS = 10     # least iterations trained per move
 C = 0       # currently set to massively prefer exploitation over exploration
+WORKERS = 0         # processes growing independent trees, 0 for none
+CHECK_EVERY = 16    # iterations trained between checks of the clock
+HORIZON = 8         # moves played out before estimating, None for no limit
+ROLLOUT_H = h_combiner([(h1, 1/8), (h3, 1)])    # estimates cut off playouts
+ROLLOUT = RandomPolicy()                        # picks moves in playouts
+RAVE_K = 1000       # visits at which AMAF and UCT values are weighted 
+                    # equally, None to not use RAVE
+DEBUG = False       # report iterations/sec each move on stderr
 
 
 class Agent:
@@ -34,16 +50,29 @@ class Agent:
     first_move: bool
     color: PlayerColor
     # model: MCTS | None              # None until initialised
+    rate: float                         # iterations/sec of last move
+    workers: int                        # tree growing processes, 0 for none
+    pool: ProcessPoolExecutor | None    # kept between turns, if any
 
-    def __init__(self, color: PlayerColor, **referee: dict):
+    def __init__(self, color: PlayerColor, workers: int = WORKERS, 
+                 **referee: dict):
         """
         This constructor method runs when the referee instantiates the agent.
-        All setup and/or precomputation is done here.
+        All setup and/or precomputation is done here. Starts `workers` tree
+        growing processes if more than 0.
         """
         self.first_move = True
         self.color = color
-        self.game = Gamestate()
+        self.game = BitGamestate()
         self.model = None
+        self.rate = 0.0
+
+        self.workers = workers
+        self.pool = None
+        if workers > 0:
+            # Forking would copy the referee's stream overrides into workers
+            self.pool = ProcessPoolExecutor(workers, get_context("forkserver"),
+                                            initializer=_init_tree_worker)
 
     def action(self, **referee: dict) -> Action:
         """
@@ -57,12 +86,28 @@ class Agent:
         
         else:
             # Intelligently select next move
-            # Prepare model for playing on 'second move'
-            if self.model == None: self.model = MCTS(C, self.game)
+            time_slice = turn_time_slice(self.game, referee)
+            # Merge trees grown by each worker if any
+            if self.pool != None: 
+                start = perf_counter()
+                (move, n) = parallel_move(self.pool, self.workers, self.game,
+                                          time_slice)
+                elapsed = perf_counter() - start
+            
+            else:
+                # Prepare model for playing on 'second move'
+                if self.model == None: self.model = MCTS(C, self.game)
+
+                # Train model until out of time for this turn, select move
+                start = process_time()
+                n = self.model.train(ITERATIONS, start + time_slice)
+                elapsed = process_time() - start
+                move = self.model.choose_move(self.model.root)
 
-            # Train model set amount of times and select next move
-            self.model.train(ITERATIONS)
-            return self.model.choose_move(self.model.root)
+            self.rate = n / max(elapsed, 1e-9)
+            if DEBUG: 
+                print(f"MCTS: {n} iterations, {self.rate:.1f}/sec", file=stderr)
+            return move
 
     def update(self, color: PlayerColor, action: Action, **referee: dict):
         """
@@ -76,251 +121,311 @@ class Agent:
         if self.model != None: self.model.new_root(self.game)
 
 
-class Node():
-    """A class to act as a multi-directional linked node in a tree of precursor
-    and successor states. Specialised to manage the Tetress Gamestate and 
-    PlaceAction types."""
-    parent: Node | None
-    sub: set['Node'] | None                 # Avoid regenerating children
-
-    game: Gamestate
-    move: PlaceAction
-
-    def __init__(self, game: Gamestate, move: PlaceAction | None = None, 
-                 parent: Node | None = None):
-        self.parent = parent
-        self.sub = None
-        self.move = move
-        self.game = game
-
-    def all_children(self, monte: MCTS) -> set['Node']:
-        """Avoid ever generating move and child state again by storing in MCTS 
-        dictionary and locally in self.sub set. Does not alter parent / move of 
-        already seen gamestates in MCTS."""
-        # Only generate children if not yet done so
-        if self.sub == None:
-            self.sub = set()
-
-            clr = self.game.current
-            # Add all children states to node
-            for move in possible_moves(self.game.board, clr):
-                sub_game = self.game.child(move, clr)
-                # Don't store in mcts if already generated
-                f = flatten_board(sub_game.board)
-                if f not in monte.seen:
-                    s = Node(sub_game, move, self)
-                    monte.register(s, f)
-                self.sub.add(monte.seen[f])
-        else: monte.reuse_count += 1
-            
-        return self.sub
-    
-    def item(self) -> PlaceAction:
-        return self.move
+def parallel_move(pool: ProcessPoolExecutor, workers: int, 
+                  game: BitGamestate, time_slice: float
+                  ) -> tuple[Action | None, int]:
+    """Root parallel MCTS. Has each of `workers` processes of `pool` grow an
+    independent tree from Gamestate `game` for `time_slice` seconds, then sums
+    their visits and utility for each root move. Returns a move proven won by
+    any worker if there is one, otherwise the most visited move not proven
+    lost - None if none were explored - and the iterations trained in all."""
+    tasks = [pool.submit(_grow_tree, game, time_slice) for _ in range(workers)]
+    N, U, P = {}, {}, {}
+    iterations = 0
+    for task in tasks:
+        (stats, i) = task.result()
+        iterations += i
+        for (id, (n, u, proof)) in stats.items():
+            N[id] = N.get(id, 0) + n
+            U[id] = U.get(id, 0) + u
+            # Proofs are exact, so any worker's proof holds for all
+            if proof: P[id] = proof
+
+    if len(N) == 0: return (None, iterations)
+    best = max(N, key=lambda id: (P.get(id, 0), N[id], U[id]))
+    return (PLACEMENTS[best], iterations)
+
+def _init_tree_worker():
+    """Sets up a tree growing worker process, seeding it so that workers 
+    play different random playouts."""
+    seed()
+
+# Worker process' own tree, kept between turns
+_model: 'MCTS | None' = None
+
+def _grow_tree(game: BitGamestate, time_slice: float
+               ) -> tuple[dict[int, tuple[int, int, int]], int]:
+    """Worker task of parallel_move(). Trains this process' tree from root 
+    `game` for `time_slice` seconds, returning its root statistics and the
+    iterations trained."""
+    global _model
+    if _model == None: _model = MCTS(C, game)
+    else: _model.new_root(game)
+
+    # Workers share the cores, so train by wall clock rather than CPU time
+    n = _model.train(1, perf_counter() + time_slice, perf_counter)
+    return (_model.root_stats(), n)
 
 
 class MCTS():
     """Work In Progress:
     A class defined to act as the interface / brains of a Monte Carlo Tree 
     Search algorithm, storing state occurence frequency and win rate for each 
-    explored state.
+    explored state in a compact array backed Tree. Only the root Gamestate is
+    kept - moves are replayed onto it on the way down the tree, and reverted
+    after each iteration.
+    Acts as an MCTS-Solver - terminal states are proven wins or losses, and 
+    proofs are passed up the tree so settled lines are no longer simulated.
+    Optionally blends All-Moves-As-First statistics into UCB1 (RAVE), so one
+    simulation informs the value of every placement it made.
     
     Heavily inspired by the code supplied by Luke Harold Miles (qpwo) found
     here: https://gist.github.com/qpwo/c538c6f73727e254fdc7fab81024f6e1."""
-    N: dict[Node: int]                      # occurences
-    U: dict[Node: int]                      # utility (wins)
     ucb1_c: float
-
-    children: dict[Node: set[Node]]
-    seen: dict[str: Node]     # Flat board dictionary to search for nodes
-    root: Node
-
-    def __init__(self, c: float, base: Gamestate):
+    horizon: int | None                     # playout length, None to the end
+    policy: RandomPolicy | GreedyPolicy     # picks moves in playouts
+    rave_k: float | None                    # RAVE schedule, None for no RAVE
+    tree: Tree
+    game: BitGamestate                      # state at root, or walked to
+    root: int
+
+    def __init__(self, c: float, base: BitGamestate, 
+                 horizon: int | None = HORIZON, 
+                 policy: RandomPolicy | GreedyPolicy = ROLLOUT, 
+                 rave_k: float | None = RAVE_K):
         """
         The initiation point for handling a Monte Carlo Tree Search approach to 
         searching through next possible moves from an initial Gamestate `base`. 
-        Exploitation vs exploration constant in ubc1 algo defined by `c` param.
+        Exploitation vs exploration constant in ubc1 algo defined by `c` param,
+        moves played out per simulation by `horizon`, picked by `policy`, and
+        the RAVE schedule by `rave_k`.
         """
-        # todo - abstract this code away from Gamestate
-        self.root = Node(base)
         self.ucb1_c = c 
-
-        self.N = {}
-        self.U = {}
-        self.children = {}
-        
-        self.seen = {}
-        self.reuse_count = 0
+        self.horizon = horizon
+        self.policy = policy
+        self.rave_k = rave_k
+        self.game = base.copy()
+        self.tree = Tree(base.hash)
+        self.root = ROOT
 
         # Immediately expand 
         self.expand(self.root)
 
 
-    def select(self, state: Node) -> Node:     
-        """Step 1: Select way through tree until leaf node is found"""   
+    def select(self, state: int) -> list[int]:     
+        """Step 1: Select way through tree until leaf node is found, applying
+        each move on the way to the MCTS' Gamestate. Returns the path of nodes
+        walked, from `state` to the leaf."""   
+        tree = self.tree
+        path = [state]
         # Linearly (in relation to tree depth) walk through states until 
         # unexplored or end state found. 
         while True:
             # Check for new unexplored state
-            if state not in self.children: return state
-            # And check for terminal state (no following children)
-            elif len(self.children[state]) == 0: return state
+            if not tree.expanded(state): return path
+            # And check for terminal or proven state (outcome already known)
+            elif tree.count[state] == 0 or tree.proof[state]: return path
             
-            # Check if there exists an unexpanded child of current state
-            for child in self.children[state]:
-                if child not in self.children:
-                    return child
+            # Check if there exists an unvisited child of current state - 
+            # RAVE instead values these by their AMAF statistics
+            if self.rave_k is None:
+                for child in tree.children(state):
+                    if tree.N[child] == 0:
+                        self.enter(child)
+                        path.append(child)
+                        return path
             
             # Otherwise step down a level
             state = self.step_down(state)
-
-    def expand(self, state: Node):
-        """Step 2: Expand - add singular new child from above leaf node"""
+            self.enter(state)
+            path.append(state)
+
+    def enter(self, node: int):
+        """Applies the move into `node` to the MCTS' Gamestate, noting the
+        hash of the node's state."""
+        self.game.push(PLACEMENTS[self.tree.move[node]])
+        self.tree.hash[node] = self.game.hash
+
+    def expand(self, state: int):
+        """Step 2: Expand - add all children of above leaf node, if the tree
+        has room for them. Terminal states are expanded with no children and
+        proven by their outcome."""
+        tree = self.tree
+        game = self.game
         # Skip state if already expanded
-        if state in self.children: return
-
-        # Add to seen dictionary if first sighting
-        f = flatten_board(state.game.board)
-        if f not in self.seen:
-            self.register(state, f)
-
-        # Otherwise enqueue children to MCTS and prepare count dictionaries
-        self.children[state] = state.all_children(self)
-
-    def simulate(self, node: Node) -> ValWrap:
-        """Step 3: Simulate playout with newly added node to terminal state, not 
-        yet adding child nodes to playout tree.
+        if tree.expanded(state): return
+
+        # Game over by turn limit - player with the most tokens wins
+        if game.turn > MAX_TURNS:
+            tree.expand(state, [])
+            diff = game.counts[game.current] - \
+                game.counts[game.current.opponent]
+            if diff < 0: tree.proof[state] = WIN
+            elif diff > 0: tree.proof[state] = LOSS
+        # Game over by player to move having no moves - they lose
+        elif not game.legal[game.current]:
+            tree.expand(state, [])
+            tree.proof[state] = WIN
+        else: tree.expand(state, sorted(game.legal[game.current]))
+
+    def simulate(self, node: int, moves: list[int] | None = None
+                 ) -> ValWrap:
+        """Step 3: Simulate a light playout by MCTS' `policy` from newly added 
+        node to terminal state, or for MCTS' `horizon` moves, on a scratch 
+        state, adding nothing to the tree. Placement ids played are appended
+        to `moves` if given.
         
         Returns:
-          a terminal node value wrapped by termination condition:
-          1 if win, -1 if loss, 0 if draw."""
-        # Check if terminal state reached (turn count or no remaining moves)
-        if node.game.turn == MAX_TURNS:
-            # Calculate winner by tile count here - bound between [-1,1]
-            scoring = min(max(h1(node.game, node.game.current),-1),1)
-            return ValWrap(scoring, node)
-        
-        # Generate or access already generated children
-        p = node.all_children(self)
-        # Loss if no moves left
-        if len(p) == 0:
-            return ValWrap(-1, node)
-
-        # Terminal not reached - choose a random successor somehow
-        # Tuple used to convert set into iterable (for `choice` here)
-        rdm_child = choice(tuple(p))
-
-        # Inverse score for recursively deeper child state
-        x = self.simulate(rdm_child)
-        x.invert()
-        return x
-
-    def backpropagate(self, result: int, state: Node):
-        """Step 4: utilise terminal state outcome to update states from node
-        to root, adding newly seen nodes into playout tree."""
-        # Check if by some error state is unset
-        if state == None:
-            # print("ERROR: Unset node backpropagated to somehow. Investigate.")
-            return
-
-        # Update state/node success
-        self.N[state] += 1
-        self.U[state] += result
-
-        # Check if at the top (no further backpropagation needed)
-        if state == self.root:
-            return
-        # Otherwise backtrack further
-        self.backpropagate(1-result, state.parent)
-
-
-    def step_down(self, state: Node) -> Node:
+          the node wrapped with its value by termination condition, for the 
+          player who moved into it: 1 if win, -1 if loss, 0 if draw - or a 
+          float within (-1, 1) estimated by ROLLOUT_H if cut off."""
+        return ValWrap(-playout(self.game, self.horizon, ROLLOUT_H, 
+                                self.policy, moves), node)
+
+    def backpropagate(self, result: int, path: list[int]):
+        """Step 4: utilise terminal state outcome to update states along the
+        selected `path`, from its leaf back up to the root."""
+        tree = self.tree
+        for state in reversed(path):
+            # Update state/node success
+            tree.N[state] += 1
+            tree.U[state] += result
+            # Backtrack further, from the other player's perspective
+            result = 1 - result
+
+    def amaf(self, result: int, path: list[int], moves: list[int]):
+        """Step 4b: All-Moves-As-First - credits `result` (as passed to 
+        backpropagate) to each child of a state in `path` whose placement was
+        made later in the simulation by the player to move in that state. 
+        `moves` are the placement ids made from the root of `path` onwards."""
+        tree = self.tree
+        # Start from the perspective of the player to move at the leaf
+        result = 1 - result
+        for d in range(len(path) - 1, -1, -1):
+            state = path[d]
+            if tree.expanded(state):
+                for id in set(moves[d::2]):
+                    child = tree.child(state, id)
+                    if child != NONE:
+                        tree.AN[child] += 1
+                        tree.AU[child] += result
+            result = 1 - result
+
+    def prove(self, path: list[int]):
+        """Passes the proven outcome of the leaf of `path` up the path. A state
+        is lost for the player moving into it if any child is won by the next
+        player, and won if every child is lost."""
+        tree = self.tree
+        for i in range(len(path) - 1, 0, -1):
+            (node, state) = (path[i], path[i-1])
+            if tree.proof[node] == WIN: tree.proof[state] = LOSS
+            elif tree.proof[node] == LOSS and all(
+                    tree.proof[child] == LOSS 
+                    for child in tree.children(state)):
+                tree.proof[state] = WIN
+            else: return
+
+    def step_down(self, state: int) -> int:
         """Finds all children nodes from node `state` and returns the max node
-        according to UCB1 algorithm with MCTS' `ucb1_c` constant. `state` must 
-        NOT be a terminal node of tree - assert the below before calling:
-            len(state.all_children(self)) > 0"""
-        # Value wrap with UCB1 value and list all children nodes
-        l = [ValWrap(self.UCB1(child), child) 
-             for child in state.all_children(self)]
-
-        return max(l).item
+        according to UCB1 algorithm with MCTS' `ucb1_c` constant, skipping
+        proven nodes. `state` must NOT be a terminal or proven node of tree - 
+        assert the below before calling:
+            self.tree.count[state] > 0 and not self.tree.proof[state]"""
+        tree = self.tree
+        log_n = log(max(tree.N[state], 1))     # root is expanded unvisited
+        return max(tree.children(state), key=lambda node: 
+                   -inf if tree.proof[node] else self.UCB1(node, log_n))
                 
-    def UCB1(self, node: Node) -> float | None:
-        """UCB1 algorithm, balanced by MCTS' `ucb1_c` constant. Returns `None`
-        if used on a tree root node, a float otherwise."""
-        # Ensure root node is not used here
-        if node.parent == None: return None
-        # And child node scouted has been expanded
-        if node not in self.N: return inf
-
-        n = self.N[node]
-        # If n == 0 (not yet explored somehow), prioritise exploiting it
-        exploit = self.U[node] / n if n != 0 else inf
-        # explore = sqrt(log(self.N[node.parent], n) / n)
-        explore = sqrt(log(n) / n)
+    def UCB1(self, node: int, log_n: float) -> float:
+        """UCB1 algorithm, balanced by MCTS' `ucb1_c` constant, given `log_n`
+        the log of the visits to the parent of `node`. With RAVE, the node's
+        AMAF value is blended in, by a weight falling as visits grow."""
+        tree = self.tree
+        n = tree.N[node]
+        if self.rave_k is None or tree.AN[node] == 0:
+            # Ensure child node scouted has been visited
+            if n == 0: return inf
+            exploit = tree.U[node] / n
+        else:
+            beta = sqrt(self.rave_k / (3 * n + self.rave_k))
+            uct = tree.U[node] / n if n else 0
+            exploit = (1 - beta) * uct + beta * tree.AU[node] / tree.AN[node]
+
+        explore = sqrt(log_n / max(n, 1))
         return exploit + self.ucb1_c * explore
 
 
-    def train(self, n: int=1):
+    def train(self, n: int=1, deadline: float | None = None, 
+              clock: 'function' = process_time) -> int:
         """Simulate through an MCTS search `n` times, backpropagating and 
-        updating all traveled nodes in path."""
-        for _ in range(n):
-            leaf = self.select(self.root)
+        updating all traveled nodes in path. If a `deadline` is given, keeps
+        simulating past `n` until `clock()` reaches it, checking the clock
+        every CHECK_EVERY iterations, or until the root is proven. Returns the
+        number of iterations run."""
+        tree = self.tree
+        i = 0
+        while i < n or deadline is not None and \
+                (i % CHECK_EVERY or clock() < deadline):
+            if tree.proof[self.root]: break
+            i += 1
+            path = self.select(self.root)
+            leaf = path[-1]
             self.expand(leaf)
-            result = self.simulate(leaf)
             
-            # Handle win, loss, draw differently; currently treat a tie as a win
-            match result.val:
-                case -1: v = 0
-                case 0: v = 1
-                case 1: v = 1
-            self.backpropagate(v, result.item)
-            # print(f"Stored v Reuse: {len(self.seen)} . {self.reuse_count}")
-
-
-    def choose_move(self, relative_root: Node) -> Action | None:
-        """Return best move from node `relative_root` according to most explored 
-        child node of `relative_root`. Returns `None` if no children exist for
-        `relative_root` node, or a move of type `Action` if otherwise."""
-        # Training done - return most commonly explored node
-        best = None
-        n = 0
-        
-        # Only need to check children of root node as maximising occurence
-        for node in self.children[relative_root]:
-            # Skip unexplored children nodes
-            if node not in self.N: continue
-
-            rate = self.N[node]
-            if rate > n:
-                n = rate
-                best = node
-
+            # Moves made in this simulation, for RAVE
+            moves = [tree.move[node] for node in path[1:]]
+
+            # No need to simulate proven states
+            if tree.proof[leaf]:
+                v = 1 if tree.proof[leaf] == WIN else 0
+                self.prove(path)
+            else: 
+                result = self.simulate(leaf, moves)
+                # Handle win, loss, draw differently; currently treat a tie 
+                # as a win
+                match result.val:
+                    case float(): v = (1 + result.val) / 2  # estimated outcome
+                    case -1: v = 0
+                    case 0: v = 1
+                    case 1: v = 1
+            self.backpropagate(v, path)
+            if self.rave_k is not None: self.amaf(v, path, moves)
+
+            # Walk back up to the root state
+            while self.game.history: self.game.pop()
+        return i
+
+
+    def choose_move(self, relative_root: int) -> Action | None:
+        """Return best move from node `relative_root` - a proven win if there
+        is one, otherwise the most explored child node of `relative_root` not
+        proven lost. Returns `None` if no children exist for `relative_root` 
+        node, or a move of type `Action` if otherwise."""
+        tree = self.tree
         # Failsafe in case 0 training has been done (return None)
-        if best == None: return None
-        # Otherwise return best move    
-        return best.item()
-    
-
-    def find_node(self, game: Gamestate) -> Node:
-        """Returns an existing node if generated & explored, otherwise generates 
-        and returns it as a new root. Done to avoid duplicating tree spreads."""
-        f = flatten_board(game.board)
-        if f not in self.seen:
-            self.register(Node(game), f)
-        return self.seen[f]         # node of game
+        if not tree.expanded(relative_root) or tree.count[relative_root] == 0:
+            return None
+        
+        # Training done - return a won or most commonly explored node
+        best = max(tree.children(relative_root), key=lambda node: 
+                   (tree.proof[node], tree.N[node]))
+        if tree.N[best] == 0: return None
+        return PLACEMENTS[tree.move[best]]
     
-    def register(self, node: Node, flat_b: str | None = None):
-        """Begins tracking of new Node `node` in MCTS. Only call on nodes not
-        already seen."""
-        if flat_b == None: flat_b = flatten_board(node.game.board)
-        self.seen[flat_b] = node
-        self.N[node] = 0
-        self.U[node] = 0
-
-    def new_root(self, game: Gamestate):
+    def root_stats(self) -> dict[int, tuple[int, int, int]]:
+        """Returns the visits, utility and proof of each explored child of the
+        root, keyed by placement id."""
+        tree = self.tree
+        if not tree.expanded(self.root): return {}
+        return {tree.move[node]: (tree.N[node], tree.U[node], tree.proof[node])
+                for node in tree.children(self.root) if tree.N[node]}
+
+    def new_root(self, game: BitGamestate):
         """Update MCTS with new Gamestate `game` at the root - turns have passed
-        and a new root is present."""
-        self.root = self.find_node(game)
-        # self.children.clear()
-        # self.expand(self.root)
+        and a new root is present. Keeps only the subtree under the new root
+        if it has been explored, freeing the rest of the tree."""
+        node = self.tree.find(game.hash, self.root)
+        if node == NONE: self.tree = Tree(game.hash)
+        else: self.tree = self.tree.compact(node)
+        self.root = ROOT
+        self.game = game.copy()
@@ -0,0 +1,142 @@
+"""tree.py: Implements a compact, array backed tree for Monte Carlo Tree Search.
+Node statistics are stored as a struct of arrays indexed by node number rather
+than as one object per node, and nodes store the hash of their state rather
+than the state itself - states are rebuilt by replaying moves from the root.
+Nodes hold no parent link; searches record the path they walk instead."""
+
+__author__ = "Liam Anthian"
+__credits__ = ["Liam Anthian", "Anthony Hill"]
+
+# COMP30024 Artificial Intelligence, Semester 1 2024
+# Project Part B: Game Playing Agent
+
+# === Imports ===
+from array import array
+from bisect import bisect_left
+
+# === Constants ===
+ROOT = 0                # node number of the root
+NONE = -1               # no node / move
+MAX_NODES = 500000      # most nodes held at once, bounding memory use
+WIN = 1                 # proven outcomes, for the player moving into a node
+LOSS = -1
+UNPROVEN = 0
+
+
+class Tree:
+    """
+    A tree of nodes numbered from ROOT, where the children of a node are
+    stored contiguously from its `first` child, in order of placement id. A 
+    node is expanded once its `first` is set, and is terminal if expanded with
+    no children.
+    """
+    move: array             # placement id of the move into each node
+    first: array            # first child of each node, NONE if unexpanded
+    count: array            # number of children of each node
+    N: array                # visits of each node
+    U: array                # utility of each node, for the player moving in
+    proof: array            # proven outcome of each node, UNPROVEN if not
+    AN: array               # All-Moves-As-First visits of each node
+    AU: array               # All-Moves-As-First utility of each node
+    hash: array             # Gamestate hash of each node, 0 until visited
+
+    def __init__(self, root_hash: int | None = None):
+        """Creates a tree of just a root node of hash `root_hash`, or an empty
+        tree if None."""
+        self.move = array('i')
+        self.first = array('i')
+        self.count = array('i')
+        self.N = array('i')
+        self.U = array('d')
+        self.proof = array('b')
+        self.AN = array('i')
+        self.AU = array('d')
+        self.hash = array('Q')
+        if root_hash is not None: self._append(NONE, root_hash)
+
+    def __len__(self) -> int:
+        return len(self.move)
+
+    def _append(self, move: int, hash: int = 0, n: int = 0, u: float = 0,
+                proof: int = UNPROVEN, an: int = 0, au: float = 0) -> int:
+        """Adds a single unexpanded node, returning its node number."""
+        self.move.append(move)
+        self.first.append(NONE)
+        self.count.append(0)
+        self.N.append(n)
+        self.U.append(u)
+        self.proof.append(proof)
+        self.AN.append(an)
+        self.AU.append(au)
+        self.hash.append(hash)
+        return len(self.move) - 1
+
+    def expanded(self, node: int) -> bool:
+        """Returns True if the children of `node` have been added."""
+        return self.first[node] != NONE
+
+    def children(self, node: int) -> range:
+        """Returns the range of node numbers of the children of `node`."""
+        first = self.first[node]
+        return range(first, first + self.count[node])
+
+    def expand(self, node: int, moves: list[int]) -> bool:
+        """Adds a child to `node` for each placement id of `moves`, which must
+        be sorted. Returns False, adding nothing, if the tree has no room for
+        them."""
+        if len(self) + len(moves) > MAX_NODES: return False
+
+        n = len(moves)
+        self.first[node] = len(self)
+        self.count[node] = n
+        self.move.extend(moves)
+        self.first.extend([NONE] * n)
+        self.count.extend([0] * n)
+        self.N.extend([0] * n)
+        self.U.extend([0.0] * n)
+        self.proof.extend([UNPROVEN] * n)
+        self.AN.extend([0] * n)
+        self.AU.extend([0.0] * n)
+        self.hash.extend([0] * n)
+        return True
+
+    def child(self, node: int, move: int) -> int:
+        """Returns the child of expanded `node` by placement id `move`, NONE
+        if there is no such child."""
+        first = self.first[node]
+        end = first + self.count[node]
+        i = bisect_left(self.move, move, first, end)
+        return i if i < end and self.move[i] == move else NONE
+
+    def find(self, hash: int, node: int = ROOT, depth: int = 2) -> int:
+        """Returns the first node within `depth` moves below `node` with state
+        hash `hash`, NONE if not found."""
+        if self.hash[node] == hash: return node
+        if depth == 0 or not self.expanded(node): return NONE
+        for child in self.children(node):
+            found = self.find(hash, child, depth - 1)
+            if found != NONE: return found
+        return NONE
+
+    def compact(self, root: int) -> 'Tree':
+        """Returns a new tree of only the subtree under node `root`, with
+        `root` as its ROOT. Abandoned branches are left behind to be freed."""
+        new = Tree()
+        new._append(NONE, self.hash[root], self.N[root], self.U[root],
+                    self.proof[root], self.AN[root], self.AU[root])
+        # Copy breadth first, so each node's children are copied contiguously
+        olds = [root]
+        i = 0
+        while i < len(olds):
+            old = olds[i]
+            if self.expanded(old):
+                new.first[i] = len(new)
+                new.count[i] = self.count[old]
+                for child in self.children(old):
+                    new._append(self.move[child], self.hash[child],
+                                self.N[child], self.U[child], 
+                                self.proof[child], self.AN[child], 
+                                self.AU[child])
+                    olds.append(child)
+            i += 1
+        return new
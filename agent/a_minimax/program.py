@@ -10,8 +10,8 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # Project Part B: Game Playing Agent
 
 # === Imports ===
-from agent.control import first_move, possible_moves
-from agent.gamestate import Gamestate
+from agent.control import first_move
+from agent.bitgamestate import BitGamestate
 from agent.heuristics import *
 from agent.valwrap import ValWrap
 
@@ -37,7 +37,7 @@ class Agent:
         """
         self.first_move = True
         self.color = color
-        self.game = Gamestate()
+        self.game = BitGamestate()
 
     def action(self, **referee: dict) -> Action:
         """
@@ -63,7 +63,7 @@ class Agent:
         self.game.move(action, color)
 
 
-def minimax(game: Gamestate, depth: int, heu) -> Action | None:
+def minimax(game: BitGamestate, depth: int, heu) -> Action | None:
     """Origin point for default minimax approach to searching through next
     possible moves for a gamestate `game`. Remaining max recursions are 
     determined from `depth`, and bottom nodes evaluated according to the
@@ -74,15 +74,20 @@ def minimax(game: Gamestate, depth: int, heu) -> Action | None:
 
     else: 
         # Find next level of the tree of possible states
-        moves = possible_moves(game.board, game.current)
+        moves = game.legal_moves(game.current)
         if len(moves) == 0: return None
 
         # Recurse down this level to depth `depth`, returning best move
-        m = max([sub_minimax(game.child(p,game.current), p, game.current, 
-                             depth-1, heu) for p in moves])
-        return m.item
-
-def sub_minimax(game: Gamestate, move: Action, player: PlayerColor, 
+        player = game.current
+        heus = []
+        for p in moves:
+            # Walk down the tree in place, reverting move once searched
+            game.push(p)
+            heus.append(sub_minimax(game, p, player, depth-1, heu))
+            game.pop()
+        return max(heus).item
+
+def sub_minimax(game: BitGamestate, move: Action, player: PlayerColor, 
                 depth: int, heu) -> ValWrap:
     """minimax() sub-function. Depending on players turn, either maximises
     or minimises outcome. Returns a ValWrap-ed Action."""
@@ -98,7 +103,7 @@ def sub_minimax(game: Gamestate, move: Action, player: PlayerColor,
 
     else: 
         # Find next level of the tree of possible states
-        moves = possible_moves(game.board, game.current)
+        moves = game.legal_moves(game.current)
 
         # If no moves remaining, reflect this WIN/LOSS from player's perspective
         if len(moves) == 0:
@@ -106,8 +111,11 @@ def sub_minimax(game: Gamestate, move: Action, player: PlayerColor,
             else: return ValWrap(WIN, move)
 
         # Proceed with minimum or maximum value depending on turn
-        heus = [sub_minimax(game.child(p,game.current), move, 
-                        player, depth-1, heu) for p in moves]
+        heus = []
+        for p in moves:
+            game.push(p)
+            heus.append(sub_minimax(game, move, player, depth-1, heu))
+            game.pop()
 
         if game.current == player:
             # Player chooses highest next value move
@@ -0,0 +1,65 @@
+"""bitboard.py: Provides constants and functions to convert between board
+Coords, integer cell ids and integer bitmasks of cells on the toroidal board.
+Bit `cell_id(coord)` of a mask is set when said coord is part of the mask."""
+
+__author__ = "Liam Anthian"
+__credits__ = ["Liam Anthian", "Anthony Hill"]
+
+# COMP30024 Artificial Intelligence, Semester 1 2024
+# Project Part B: Game Playing Agent
+
+# === Imports ===
+from referee.game import Coord, COORDS, BOARD_N
+
+# === Constants ===
+CELLS = BOARD_N * BOARD_N
+FULL = (1 << CELLS) - 1
+
+# Masks of every cell in a given row / column of the board
+ROW_MASKS = [((1 << BOARD_N) - 1) << (r * BOARD_N) for r in range(BOARD_N)]
+COL_MASKS = [sum(1 << (r * BOARD_N + c) for r in range(BOARD_N))
+             for c in range(BOARD_N)]
+LINES = ROW_MASKS + COL_MASKS
+_FIRST_COL = COL_MASKS[0]
+_LAST_COL = COL_MASKS[BOARD_N - 1]
+_WRAP = CELLS - BOARD_N
+
+
+def cell_id(coord: Coord) -> int:
+    """Returns the integer index (0 to 120) of a Coord `coord`, counted row by
+    row from the top left corner of the board."""
+    return coord.id
+
+def cell_coord(cell: int) -> Coord:
+    """Inverse of cell_id(). Returns the Coord of integer cell index `cell`."""
+    return COORDS[cell]
+
+def coords_mask(coords) -> int:
+    """Returns the bitmask of an iterable of Coords `coords`."""
+    mask = 0
+    for coord in coords:
+        mask |= 1 << coord.id
+    return mask
+
+def mask_cells(mask: int) -> list[int]:
+    """Returns a list of the cell ids set in bitmask `mask`, in cell order."""
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+def mask_coords(mask: int) -> list[Coord]:
+    """Returns a list of the Coords set in bitmask `mask`, in cell order."""
+    return [cell_coord(cell) for cell in mask_cells(mask)]
+
+def spread(mask: int) -> int:
+    """Returns the mask of all cells 4-adjacent to any cell in bitmask `mask`
+    on the toroidal board. Cells of `mask` itself are only included if they
+    neighbour another cell of `mask`."""
+    down = ((mask << BOARD_N) | (mask >> _WRAP)) & FULL
+    up = (mask >> BOARD_N) | ((mask << _WRAP) & FULL)
+    right = ((mask & ~_LAST_COL) << 1) | ((mask & _LAST_COL) >> (BOARD_N - 1))
+    left = ((mask & ~_FIRST_COL) >> 1) | ((mask & _FIRST_COL) << (BOARD_N - 1))
+    return down | up | right | left
@@ -0,0 +1,232 @@
+"""bitgamestate.py: Implements a bitboard backed alternative to the Gamestate
+data structure. Each player's tokens are stored as a 121 bit integer mask, so
+copying and updating a state is a handful of integer operations rather than a
+dictionary copy."""
+
+__author__ = "Liam Anthian"
+__credits__ = ["Liam Anthian", "Anthony Hill"]
+
+# COMP30024 Artificial Intelligence, Semester 1 2024
+# Project Part B: Game Playing Agent
+
+# === Imports ===
+from .bitboard import COL_MASKS, LINES, ROW_MASKS, mask_cells, mask_coords, \
+    spread
+from .placements import LINE_MASKS, PLACEMENTS, PLACEMENT_MASKS, TOUCHING
+from .zobrist import SIDE, mask_hash, side_hash
+
+from referee.game import Action, Coord, PlaceAction, PlayerColor
+
+# === Constants ===
+PIECE_N = 4             # cells covered by a placement
+
+class BitGamestate:
+    """
+    Alternative to Gamestate storing the board as one integer bitmask per
+    player, with bit `cell_id(coord)` set where that player has a token.
+    Exposes the same move / child / counts / turn / current interface.
+    """
+    masks: dict[PlayerColor, int]
+    current: PlayerColor
+    turn: int
+
+    # Kept alongside masks to avoid recounting set bits on every access
+    counts: dict[PlayerColor, int]
+    # Ids of each player's legal placements, maintained move to move
+    legal: dict[PlayerColor, set[int]]
+    # Zobrist hash of tokens and side to move (see zobrist.py)
+    hash: int
+    # Undo records of pushed actions, most recent last
+    history: list[tuple]
+
+    def __init__(self, color: PlayerColor = PlayerColor.RED, turn: int = 1):
+        """Constructor method for instantiating and preparing a new
+        BitGamestate"""
+        self.masks = {PlayerColor.RED: 0, PlayerColor.BLUE: 0}
+        self.current = color                # Red starts by default
+        self.turn = turn                    # First turn is turn 1 by default
+        self.counts = {PlayerColor.RED: 0, PlayerColor.BLUE: 0}
+        self.legal = {PlayerColor.RED: set(), PlayerColor.BLUE: set()}
+        self.hash = side_hash(color)
+        self.history = []
+
+    @property
+    def occupied(self) -> int:
+        """Bitmask of all cells holding a token of either color."""
+        return self.masks[PlayerColor.RED] | self.masks[PlayerColor.BLUE]
+
+    @property
+    def board(self) -> dict[Coord, PlayerColor]:
+        """Sparse dictionary view of the board, matching Gamestate.board. Built
+        on every access - prefer the masks where possible."""
+        board = {}
+        for clr, mask in self.masks.items():
+            for coord in mask_coords(mask):
+                board[coord] = clr
+        return board
+
+    def move(self, action: Action, color: PlayerColor):
+        """Apply an Action to a board and update state measures. Assumes the
+        action has been validated first."""
+        self._apply(action, color)
+
+    def push(self, action: Action):
+        """Apply an Action in place for the player to move, recording what is
+        needed to revert it with pop(). Lets depth first searches walk a tree
+        on a single state rather than generating a child per node."""
+        self.history.append(self._apply(action, self.current))
+
+    def pop(self):
+        """Revert the last pushed Action. Raises an IndexError if no actions
+        have been pushed."""
+        (color, own, other, prev_hash, changes) = self.history.pop()
+
+        self.masks[color] = own
+        self.masks[color.opponent] = other
+        self.counts[color] = own.bit_count()
+        self.counts[color.opponent] = other.bit_count()
+        self.hash = prev_hash
+
+        for (clr, (added, removed)) in zip((color, color.opponent), changes):
+            self.legal[clr] -= added
+            self.legal[clr] |= removed
+
+        self.current = color
+        self.turn -= 1
+
+    def _apply(self, action: Action, color: PlayerColor) -> tuple:
+        """Applies an Action, returning an undo record of the moving `color`, 
+        both players' masks and the hash before the move, and the changes made
+        to each player's legal placements."""
+        placed = action.mask
+        before = self.masks.copy()
+        own = before[color] | placed
+        other = before[color.opponent]
+        occupied = own | other
+
+        # Only axes the piece touches can have been filled by it
+        clear = 0
+        for coord in action.coords:
+            row = ROW_MASKS[coord.r]
+            col = COL_MASKS[coord.c]
+            if occupied & row == row: clear |= row
+            if occupied & col == col: clear |= col
+
+        undo_hash = self.hash
+        self.hash ^= mask_hash(placed, color) ^ SIDE
+        if clear:
+            self.hash ^= mask_hash(own & clear, color)
+            self.hash ^= mask_hash(other & clear, color.opponent)
+            own &= ~clear
+            other &= ~clear
+            self.masks[color.opponent] = other
+            self.counts[color.opponent] = other.bit_count()
+        self.masks[color] = own
+        self.counts[color] = own.bit_count()
+
+        # Only placements near changed cells can change legality
+        dead = placed & ~clear
+        changes = tuple(self._refresh_legal(clr, before, dead, clear)
+                        for clr in (color, color.opponent))
+
+        self.current = color.opponent
+        self.turn += 1
+        return (color, before[color], before[color.opponent], undo_hash, 
+                changes)
+
+    def _refresh_legal(self, color: PlayerColor, before: dict[PlayerColor, int],
+                       dead: int, clear: int) -> tuple[set[int], set[int]]:
+        """Updates the legal placement ids of `color` after a move, given masks
+        `before` the move, the mask of newly filled cells `dead` and the mask
+        of cleared cells `clear`. A placement is legal if it covers no token 
+        and at least one empty cell bordering a token of `color`.
+        Returns the sets of placement ids added and removed."""
+        legal = self.legal[color]
+        removed = set()
+        occupied = self.occupied
+        old_frontier = spread(before[color]) & ~(before[PlayerColor.RED] | 
+                                                 before[PlayerColor.BLUE])
+        frontier = spread(self.masks[color]) & ~occupied
+
+        # Placements over newly filled cells can no longer be legal
+        for cell in mask_cells(dead):
+            gone = legal.intersection(TOUCHING[cell])
+            legal -= gone
+            removed |= gone
+
+        # Recheck placements over emptied cells or cells gaining / losing a
+        # bordering token of `color`
+        recheck = set()
+        for cell in mask_cells(((old_frontier ^ frontier) | clear) & ~dead):
+            recheck.update(TOUCHING[cell])
+        masks = PLACEMENT_MASKS
+        valid = {id for id in recheck 
+                 if not masks[id] & occupied and masks[id] & frontier}
+        gone = legal.intersection(recheck) - valid
+        added = valid - legal
+        legal -= gone
+        legal |= added
+        removed |= gone
+
+        return added, removed
+
+    def copy(self) -> 'BitGamestate':
+        """Generates a new BitGamestate object with identical stats."""
+        new = BitGamestate(self.current, self.turn)
+        new.masks = self.masks.copy()
+        new.counts = self.counts.copy()
+        new.legal = {clr: ids.copy() for (clr, ids) in self.legal.items()}
+        new.hash = self.hash
+        return new
+
+    def child(self, action: Action, color: PlayerColor) -> 'BitGamestate':
+        """Generates a new BitGamestate object and applys an Action to it,
+        updating state measures."""
+        new = self.copy()
+        new.move(action, color)
+        return new
+
+    def legal_moves(self, color: PlayerColor) -> list[PlaceAction]:
+        """Returns all legal PlaceActions for player `color`."""
+        return [PLACEMENTS[id] for id in self.legal[color]]
+
+    def clear_mask(self, id: int) -> int:
+        """Returns the mask of cells placement id `id` would clear by filling a
+        row or column, 0 if none. Checks only the lines the placement covers,
+        without applying it."""
+        occupied = self.occupied | PLACEMENT_MASKS[id]
+        clear = 0
+        for line in LINE_MASKS[id]:
+            if occupied & line == line: clear |= line
+        return clear
+
+    def completes_line(self, id: int) -> bool:
+        """Returns True if placement id `id` would fill a row or column."""
+        occupied = self.occupied | PLACEMENT_MASKS[id]
+        for line in LINE_MASKS[id]:
+            if occupied & line == line: return True
+        return False
+
+    def line_clears(self, color: PlayerColor) -> list[int]:
+        """Returns the ids of legal placements of `color` that fill a row or
+        column. A placement fills a line only by covering all of its empty 
+        cells, so only lines with at most four empty cells are checked."""
+        occupied = self.occupied
+        legal = self.legal[color]
+        ids = set()
+        for line in LINES:
+            gap = line & ~occupied
+            if gap and gap.bit_count() <= PIECE_N:
+                cells = mask_cells(gap)
+                fill = legal.intersection(TOUCHING[cells[0]])
+                for cell in cells[1:]: fill.intersection_update(TOUCHING[cell])
+                ids |= fill
+        return list(ids)
+
+    def mobility(self, color: PlayerColor) -> int:
+        """Returns the number of legal PlaceActions for player `color`."""
+        return len(self.legal[color])
+
+    def air_neighbours(self, color: PlayerColor) -> int:
+        """Returns the number of empty cells adjacent to a token of `color`."""
+        return (spread(self.masks[color]) & ~self.occupied).bit_count()
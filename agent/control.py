@@ -8,9 +8,17 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # Project Part B: Single Player Tetress
 
 from random import randint, choice
+from time import process_time
 
-from referee.game import Coord, Direction, PlaceAction, PlayerColor, BOARD_N
-from .tetrominoes import tetrominoes_plus
+from referee.game import Coord, PlaceAction, PlayerColor, BOARD_N, \
+    MAX_TURNS, NEIGHBOURS
+from .bitboard import cell_id, coords_mask, spread
+from .bitgamestate import BitGamestate
+from .placements import ADJACENT, PLACEMENTS, PLACEMENT_MASKS, \
+    frontier_placements
+
+TIME_LIMIT = 180.0      # CPU seconds assumed if the referee sets no limit
+TIME_SAFETY = 0.9       # fraction of remaining time shared out over turns
 
 def is_I_shape(action: PlaceAction) -> bool:
     """ Check if the given PlaceAction corresponds to an 'I' shape. """
@@ -23,9 +31,8 @@ def is_adjacent(coord: Coord, board_keys: list[Coord]) -> bool:
     existing blocks on a toroidal board. """
     adjacent_count = 0
     # Check four possible adjacent positions: up, down, left, right
-    # Inbuilt adjustment for toroidal wrap-around via Coord class.
-    for dir in [d.value for d in Direction]:
-        adjacent_coord = Coord.__add__(coord, dir)
+    # Inbuilt adjustment for toroidal wrap-around via NEIGHBOURS table.
+    for adjacent_coord in NEIGHBOURS[coord.id]:
         if adjacent_coord in board_keys:
             adjacent_count += 1
 
@@ -37,17 +44,17 @@ def first_move(board: dict):
     Takes a game `board` and returns a random PlaceAction on the board depending 
     on whether its first move or second move (any colour can start)
     """
-    possible_actions = []
     # If board is empty, location of placed tile place is arbitrary
     # - infinite edges means no strategic benefit of location
     if len(board) == 0:
-        random_coord = Coord(randint(0, BOARD_N - 1), randint(0, BOARD_N - 1))
-        possible_actions = tetrominoes_plus(random_coord, set(board.keys())) 
-    
+        target = Coord(randint(0, BOARD_N - 1), randint(0, BOARD_N - 1))
     else:
-        occupied_coords = list(board.keys())
-        possible_actions = tetrominoes_plus(choice(occupied_coords), 
-                                            set(board.keys()))
+        target = choice(list(board.keys()))
+
+    # Placements bordering target cell, not overlapping any existing tiles
+    occupied = coords_mask(board.keys())
+    possible_actions = [PLACEMENTS[id] for id in ADJACENT[cell_id(target)]
+                        if not PLACEMENT_MASKS[id] & occupied]
 
     # Filter out I piece placements to limit risk in one axes
     non_I_actions = [a for a in possible_actions if not is_I_shape(a)]
@@ -61,13 +68,12 @@ def possible_moves(board: dict[Coord, PlayerColor],
     all possible next moves for said player in the form of a list of 
     PlaceActions.
     """
-    moves = set()
-    for (coord, color) in board.items():
-        if color == player:
-            # duplicate moves generated and ignored here (possible improvement)
-            moves.update(tetrominoes_plus(coord, set(board.keys())))
+    occupied = coords_mask(board.keys())
+    own = coords_mask(c for (c, clr) in board.items() if clr == player)
 
-    return list(moves)
+    # Every legal move covers an empty cell bordering one of player's tokens
+    frontier = spread(own) & ~occupied
+    return [PLACEMENTS[id] for id in frontier_placements(frontier, occupied)]
 
 
 def free_cells(
@@ -106,36 +112,48 @@ def free_cells(
 def clear_axes(
     board: dict[Coord, PlayerColor],
     row_range: list[int]=range(BOARD_N),
-    col_range: list[int]=range(BOARD_N)
-) -> None:
+    col_range: list[int]=range(BOARD_N),
+    rows: list[int] | None = None,
+    cols: list[int] | None = None
+) -> dict[Coord, PlayerColor]:
     """
     Acts in place - clears filled rows and columns on a game `board`. Only 
     checks for clearable axes in the row and column ranges supplied, to make 
     targetted clearing more efficient. Checks all rows and columns by default. 
-    Returns nothing (None).
+    If per-axis fill counts `rows` and `cols` are supplied, full axes are found
+    from these rather than by counting cells, and counts are kept up to date as
+    cells are cleared.
+    Returns a dictionary of the cleared tokens and their colors.
     """
     IRRELEVANT = 0
 
     # Find all cells that exist in checked filled rows/cols
     to_clear = set()
     for r in row_range:
-        if free_cells(board, Coord(r,IRRELEVANT), "r") == 0:
-            [to_clear.add(Coord(r,i)) for i in range(BOARD_N)]
+        if rows is not None: full = rows[r] == BOARD_N
+        else: full = free_cells(board, Coord(r,IRRELEVANT), "r") == 0
+        if full: [to_clear.add(Coord(r,i)) for i in range(BOARD_N)]
     for c in col_range:
-        if free_cells(board, Coord(IRRELEVANT,c), "c") == 0:
-            [to_clear.add(Coord(i,c)) for i in range(BOARD_N)]
+        if cols is not None: full = cols[c] == BOARD_N
+        else: full = free_cells(board, Coord(IRRELEVANT,c), "c") == 0
+        if full: [to_clear.add(Coord(i,c)) for i in range(BOARD_N)]
 
     # Drop these cells from board
+    cleared = {}
     for tile in to_clear:
-        board.pop(tile, 0)
+        cleared[tile] = board.pop(tile)
+        if rows is not None: rows[tile.r] -= 1
+        if cols is not None: cols[tile.c] -= 1
 
-    return None
+    return cleared
     
 
 def make_place(
     board: dict[Coord, PlayerColor], 
     place: PlaceAction, 
     color: PlayerColor,
+    rows: list[int] | None = None,
+    cols: list[int] | None = None
 ) -> dict[Coord, PlayerColor]:
     """
     Assumes the place actions have been validated first, otherwise it can write
@@ -149,10 +167,12 @@ def make_place(
         `place`: a `PlaceAction`instance of four coordinates of a tetromino
             piece to place onto the board.
         `color`: the core.py `PlayerColor` of the tetromino piece being played
+        `rows`, `cols`: optional fill counts of each row and column of `board`,
+            updated alongside the board if supplied (see clear_axes)
     
     Returns:
-        An altered board containing the changes of adding given tetromino piece
-        and clearing now full axes.
+        A dictionary of the tokens (and their colors) removed from the board by
+        clearing now full axes.
     """
     placed_r = set()
     placed_c = set()
@@ -162,7 +182,18 @@ def make_place(
         placed_r.add(coord.r)
         placed_c.add(coord.c)
         board[coord] = color
+        if rows is not None: rows[coord.r] += 1
+        if cols is not None: cols[coord.c] += 1
 
     # If necessary, clear now full rows and columns
-    clear_axes(board, list(placed_r), list(placed_c))
-    return board
+    return clear_axes(board, list(placed_r), list(placed_c), rows, cols)
+
+
+def turn_time_slice(game: BitGamestate, referee: dict) -> float:
+    """Returns the CPU time (in seconds) to spend on a turn of Gamestate `game`
+    - an even share of the time remaining, per the `referee` kwargs, over the
+    player's turns left in the game."""
+    remaining = referee.get("time_remaining")
+    if remaining is None: remaining = TIME_LIMIT - process_time()
+    turns_left = (MAX_TURNS - game.turn) // 2 + 1
+    return max(0, TIME_SAFETY * remaining / turns_left)
@@ -8,8 +8,11 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # Project Part B: Single Player Tetress
 
 # === Imports ===
-from .control import make_place
-from referee.game import Action, Coord, PlayerColor
+from .bitboard import cell_id
+from .control import make_place, possible_moves
+from .zobrist import KEYS, SIDE, side_hash
+from referee.game import Action, Coord, PlaceAction, PlayerColor, BOARD_N, \
+    NEIGHBOURS
 
 
 class Gamestate:
@@ -22,8 +25,11 @@ class Gamestate:
     current: PlayerColor
     turn: int  
 
-    # Below count done as to minimise recalculation of dictionary elements
+    # Below counts done as to minimise recalculation of dictionary elements
     counts: dict[PlayerColor, int]
+    rows: list[int]                         # tokens in each row
+    cols: list[int]                         # tokens in each column
+    hash: int                               # Zobrist hash, see zobrist.py
 
     def __init__(self, color: PlayerColor = PlayerColor.RED, turn: int = 1):
         """Constructor method for instantiating and preparing a new Gamestate"""
@@ -31,17 +37,22 @@ class Gamestate:
         self.current = color                # Red starts by default
         self.turn = turn                    # First turn is turn 1 by default
         self.counts = {PlayerColor.RED: 0, PlayerColor.BLUE: 0}
+        self.rows = [0] * BOARD_N
+        self.cols = [0] * BOARD_N
+        self.hash = side_hash(color)
 
     def move(self, action: Action, color: PlayerColor):
         """Apply an Action to a board and update state measures."""
-        make_place(self.board, action, color)
+        cleared = make_place(self.board, action, color, self.rows, self.cols)
 
-        # Not a great implementation, runs in O(k) time.
-        self.counts[PlayerColor.RED] = 0
-        self.counts[PlayerColor.BLUE] = 0
-
-        for clr in self.board.values():
-            self.counts[clr] += 1
+        # Update counts and hash by placed and cleared tokens only
+        self.counts[color] += len(action.coords)
+        for coord in action.coords:
+            self.hash ^= KEYS[color][cell_id(coord)]
+        for (coord, clr) in cleared.items():
+            self.counts[clr] -= 1
+            self.hash ^= KEYS[clr][cell_id(coord)]
+        self.hash ^= SIDE
 
         self.current = color.opponent
         self.turn += 1
@@ -51,6 +62,9 @@ class Gamestate:
         new = Gamestate(self.current, self.turn)
         new.board = self.board.copy()
         new.counts = self.counts.copy()
+        new.rows = self.rows.copy()
+        new.cols = self.cols.copy()
+        new.hash = self.hash
         return new
 
     def child(self, action: Action, color: PlayerColor) -> 'Gamestate':
@@ -60,6 +74,25 @@ class Gamestate:
         new.move(action, color)
         return new
 
+    def legal_moves(self, color: PlayerColor) -> list[PlaceAction]:
+        """Returns all legal PlaceActions for player `color`."""
+        return possible_moves(self.board, color)
+
+    def mobility(self, color: PlayerColor) -> int:
+        """Returns the number of legal PlaceActions for player `color`."""
+        return len(self.legal_moves(color))
+
+    def air_neighbours(self, color: PlayerColor) -> int:
+        """Returns the number of empty cells adjacent to a token of `color`."""
+        blank_nbrs = set()
+        for (coord, clr) in self.board.items():
+            if clr != color: continue
+            for new in NEIGHBOURS[coord.id]:
+                # If neighbour is empty air, add to tally
+                if new not in self.board:
+                    blank_nbrs.add(new)
+        return len(blank_nbrs)
+
 
 def flatten_board(board: dict[Coord, PlayerColor]) -> str:
     """
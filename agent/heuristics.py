@@ -11,9 +11,8 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # === Imports ===
 from numbers import Number
 
-from .control import possible_moves
 from .gamestate import Gamestate
-from referee.game import Coord, Direction, PlayerColor
+from referee.game import PlayerColor
 
 
 def h1(game: Gamestate, color: PlayerColor) -> int:
@@ -27,10 +26,8 @@ def h2(game: Gamestate, color: PlayerColor) -> int:
     """Returns the interger possible move difference between opponent and player
     `color` in a Gamestate `game`. A larger number is better for player.
     Goal: Maximise difference in remaining possible moves between players."""
-    # Note - Not feasible to calculate with higher branching factor (move count) 
-    a = len(possible_moves(game.board, color))
-    b = len(possible_moves(game.board, color.opponent))
-    return a - b
+    # Note - only cheap for a BitGamestate, which tracks legal moves as it goes
+    return game.mobility(color) - game.mobility(color.opponent)
 
 def h3(game: Gamestate, color: PlayerColor) -> float:
     """Returns the float neighbouring air tile difference between opponent and
@@ -38,19 +35,11 @@ def h3(game: Gamestate, color: PlayerColor) -> float:
     Balance between tiles can be altered by changing a & b values.
     Goal: Minimise possible placement tiles opponent has (suffocate them)
       while maximising a players own possible placement tiles."""
-    blank_nbrs = {color: set(), color.opponent: set()}
     a = 0.1
     b = 1
 
-    # Iterate through all tiles and their neighbours
-    for (coord, clr) in game.board.items():
-        for dir in [d.value for d in Direction]:
-            new = Coord.__add__(coord, dir)
-            # If neighbour is empty air, add one to relevant tally
-            if new not in game.board:
-                blank_nbrs[clr].add(new)
-
-    return a*len(blank_nbrs[color]) - b*len(blank_nbrs[color.opponent])
+    # Count empty tiles neighbouring each color's tokens
+    return a*game.air_neighbours(color) - b*game.air_neighbours(color.opponent)
 
 def multi_h(hs: list[tuple], game: Gamestate, color: PlayerColor) -> Number:
     """Shorthand to evaluate multiple heuristic functions across game data. `hs`
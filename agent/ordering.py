@@ -0,0 +1,123 @@
+"""ordering.py: Implements move ordering for alpha-Beta search. Moves likely to
+cause a cutoff are searched first - the transposition table's best move, then
+killer moves of the same turn, then line clears taking more of the opponent's 
+tokens than the player's own, then the rest by a history score of past cutoffs,
+keyed by placement id. Moves may be sorted all at once, or generated in stages
+so that a cutoff skips generating the rest."""
+
+__author__ = "Liam Anthian"
+__credits__ = ["Liam Anthian", "Anthony Hill"]
+
+# COMP30024 Artificial Intelligence, Semester 1 2024
+# Project Part B: Game Playing Agent
+
+# === Imports ===
+from typing import Iterator
+
+from .bitgamestate import BitGamestate
+from .placements import PLACEMENTS, PLACEMENT_MASKS
+
+from referee.game import PlaceAction
+
+# === Constants ===
+KILLERS = 2             # killer moves kept per turn
+# Rank of each ordering stage, searched highest first
+_HASH = 3
+_KILLER = 2
+_CLEAR = 1
+_QUIET = 0
+
+
+class MoveOrdering:
+    """
+    Killer move and history tables learnt from cutoffs of a search, used to
+    order the legal moves of later nodes. Killers are kept per game turn so
+    they carry over between iterative deepening iterations.
+    """
+    killers: dict[int, list[int]]       # placement ids, keyed by game turn
+    history: list[int]                  # cutoff score, by placement id
+
+    def __init__(self):
+        """Creates empty killer and history tables."""
+        self.killers = {}
+        self.history = [0] * len(PLACEMENTS)
+
+    def order(self, game: BitGamestate, hash_move: int | None = None
+              ) -> list[PlaceAction]:
+        """Returns the legal moves of the player to move in `game`, sorted in
+        search order. `hash_move` is the id of a best move found earlier."""
+        killers = self.killers.get(game.turn, ())
+        history = self.history
+        gains = clear_gains(game)
+
+        def rank(id: int) -> tuple[int, int]:
+            if id == hash_move: return (_HASH, 0)
+            if id in killers: return (_KILLER, 0)
+            if id in gains: return (_CLEAR, gains[id])
+            return (_QUIET, history[id])
+
+        ids = sorted(game.legal[game.current], key=rank, reverse=True)
+        return [PLACEMENTS[id] for id in ids]
+
+    def staged(self, game: BitGamestate, hash_move: int | None = None
+               ) -> Iterator[PlaceAction]:
+        """Yields the legal moves of the player to move in `game` in search
+        order, generating each stage only once the last is exhausted: the hash
+        move `hash_move`, then killers and gaining line clears, then the rest
+        by history score. `game` must be as it was whenever the next move is 
+        taken."""
+        legal = game.legal[game.current]
+        done = set()
+        # Stage 1 - best move of an earlier search
+        if hash_move in legal:
+            done.add(hash_move)
+            yield PLACEMENTS[hash_move]
+
+        # Stage 2 - killers, then line clears
+        for id in self.killers.get(game.turn, ()):
+            if id in legal and id not in done:
+                done.add(id)
+                yield PLACEMENTS[id]
+        gains = clear_gains(game)
+        for id in sorted(gains, key=gains.get, reverse=True):
+            if id not in done:
+                done.add(id)
+                yield PLACEMENTS[id]
+
+        # Stage 3 - the rest, by history
+        history = self.history
+        for id in sorted(legal - done, key=history.__getitem__, reverse=True):
+            yield PLACEMENTS[id]
+
+    def cutoff(self, game: BitGamestate, action: PlaceAction, depth: int):
+        """Records that `action` caused a cutoff in `game`, searched to
+        `depth`. Line clears are ranked by their gain, so only quiet moves 
+        become killers."""
+        self.history[action.id] += depth * depth
+        if game.completes_line(action.id): return
+
+        killers = self.killers.setdefault(game.turn, [])
+        if action.id not in killers:
+            killers.insert(0, action.id)
+            del killers[KILLERS:]
+
+    def age(self):
+        """Halves history scores and forgets killers of past turns, so that
+        newer cutoffs outweigh those of earlier positions."""
+        self.killers.clear()
+        self.history = [score >> 1 for score in self.history]
+
+
+def clear_gains(game: BitGamestate) -> dict[int, int]:
+    """Returns the net tokens taken (opponent's cleared less own cleared) by
+    each line clearing placement of the player to move in `game`, for those
+    taking more than they lose."""
+    own = game.masks[game.current]
+    other = game.masks[game.current.opponent]
+    gains = {}
+    for id in game.line_clears(game.current):
+        clear = game.clear_mask(id)
+        gain = (other & clear).bit_count() - \
+            ((own | PLACEMENT_MASKS[id]) & clear).bit_count()
+        if gain > 0: gains[id] = gain
+    return gains
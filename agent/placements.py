@@ -0,0 +1,73 @@
+"""placements.py: Precomputes, once at import, every distinct tetromino
+placement on the toroidal board (19 fixed piece shapes at each of the 121
+origin cells) alongside bitmasks and per-cell indexes, so that move generation
+becomes a series of table lookups."""
+
+__author__ = "Liam Anthian"
+__credits__ = ["Liam Anthian", "Anthony Hill"]
+
+# COMP30024 Artificial Intelligence, Semester 1 2024
+# Project Part B: Game Playing Agent
+
+# === Imports ===
+from .bitboard import CELLS, COL_MASKS, ROW_MASKS, mask_cells, spread
+
+from referee.game import PlaceAction
+from referee.game.pieces import PLACEMENT_COORDS
+
+
+def _build() -> tuple[list, list, list, list]:
+    """Builds the per-placement neighbour masks and per-cell indexes on top of
+    the referee's canonical placement ids (see referee.game.pieces), where:
+        id = shape_index * CELLS + cell_id(origin)"""
+    nbr_masks = []
+    lines = []
+    touching = [[] for _ in range(CELLS)]
+    adjacent = [[] for _ in range(CELLS)]
+
+    for id in range(len(PLACEMENT_COORDS)):
+        mask = PlaceAction.from_id(id).mask
+        nbrs = spread(mask) & ~mask
+        nbr_masks.append(nbrs)
+        coords = PlaceAction.from_id(id).coords
+        lines.append(tuple({ROW_MASKS[c.r] for c in coords} | 
+                           {COL_MASKS[c.c] for c in coords}))
+
+        # Index placement against every cell it covers or borders
+        for cell in mask_cells(mask): touching[cell].append(id)
+        for cell in mask_cells(nbrs): adjacent[cell].append(id)
+
+    return nbr_masks, lines, touching, adjacent
+
+_nbr_masks, _lines, _touching, _adjacent = _build()
+
+# PlaceAction (sorted Coords) of each placement id
+PLACEMENTS: tuple[PlaceAction, ...] = tuple(
+    PlaceAction.from_id(id) for id in range(len(PLACEMENT_COORDS)))
+# Bitmask of the four cells covered by each placement id
+PLACEMENT_MASKS: tuple[int, ...] = tuple(a.mask for a in PLACEMENTS)
+# Bitmask of the cells bordering each placement id (4-neighbourhood), whether
+# occupied or not
+NEIGHBOUR_MASKS: tuple[int, ...] = tuple(_nbr_masks)
+# Masks of every row and column a placement id covers a cell of
+LINE_MASKS: tuple[tuple[int, ...], ...] = tuple(_lines)
+# Ids of placements covering a given cell id
+TOUCHING: tuple[tuple[int, ...], ...] = tuple(tuple(t) for t in _touching)
+# Ids of placements bordering (but not covering) a given cell id
+ADJACENT: tuple[tuple[int, ...], ...] = tuple(tuple(a) for a in _adjacent)
+
+del _nbr_masks, _lines, _touching, _adjacent
+
+
+def free_placements(cell: int, occupied: int) -> list[int]:
+    """Returns the ids of all placements covering cell id `cell` that do not
+    overlap any cell of bitmask `occupied`."""
+    return [id for id in TOUCHING[cell] if not PLACEMENT_MASKS[id] & occupied]
+
+def frontier_placements(frontier: int, occupied: int) -> set[int]:
+    """Returns the set of placement ids covering at least one cell of bitmask
+    `frontier`, and no cell of bitmask `occupied`."""
+    ids = set()
+    for cell in mask_cells(frontier):
+        ids.update(free_placements(cell, occupied))
+    return ids
@@ -0,0 +1,180 @@
+"""playout.py: Provides light playouts for Monte Carlo searches. Moves are 
+sampled straight from the precomputed placements by rejection sampling and
+applied in place to a scratch copy of each player's token mask, so a playout
+never generates child Gamestates or tracks every legal move. Moves are picked
+by a policy object - uniformly at random, or epsilon-greedy by a cheap score
+of the placement mask. Playouts may be cut off early and scored by a 
+heuristic instead."""
+
+__author__ = "Liam Anthian"
+__credits__ = ["Liam Anthian", "Anthony Hill"]
+
+# COMP30024 Artificial Intelligence, Semester 1 2024
+# Project Part B: Game Playing Agent
+
+# === Imports ===
+from math import exp
+from numbers import Number
+from random import choice, random
+
+from .bitboard import mask_cells, spread
+from .bitgamestate import PIECE_N, BitGamestate
+from .placements import LINE_MASKS, PLACEMENT_MASKS, TOUCHING, \
+    frontier_placements
+
+from referee.game import PlayerColor, MAX_TURNS
+
+# === Constants ===
+TRIES = 16              # random placements tried before listing legal ones
+SCALE = 4               # heuristic difference valued at ~0.46 of a win
+EPSILON = 0.2           # chance of a greedy policy playing a random move
+SAMPLES = 4             # random placements a greedy policy picks between
+CLEAR_BONUS = 2         # score of each line cleared, on top of tokens taken
+AIR = 0.25              # score of each empty cell gained next to own tokens
+
+
+def random_placement(own: int, occupied: int, tries: int = TRIES
+                     ) -> int | None:
+    """Returns the id of a random legal placement for the player with token
+    mask `own`, given mask `occupied` of all tokens. Picks a random empty cell
+    bordering `own` and a random placement over it, retrying if it overlaps a
+    token, and only lists every legal placement after `tries` misses.
+    Returns None if there are no legal placements."""
+    frontier = spread(own) & ~occupied
+    if not frontier: return None
+
+    cells = mask_cells(frontier)
+    for _ in range(tries):
+        id = choice(TOUCHING[choice(cells)])
+        if not PLACEMENT_MASKS[id] & occupied: return id
+
+    ids = frontier_placements(frontier, occupied)
+    return choice(tuple(ids)) if ids else None
+
+def place(masks: dict[PlayerColor, int], id: int, color: PlayerColor):
+    """Applies placement id `id` for player `color` in place to token masks
+    `masks`, clearing any rows and columns it fills."""
+    own = masks[color] | PLACEMENT_MASKS[id]
+    other = masks[color.opponent]
+    occupied = own | other
+
+    clear = 0
+    for line in LINE_MASKS[id]:
+        if occupied & line == line: clear |= line
+    masks[color] = own & ~clear
+    masks[color.opponent] = other & ~clear
+
+def estimate(masks: dict[PlayerColor, int], current: PlayerColor, turn: int,
+             player: PlayerColor, heu) -> float:
+    """Scores token masks `masks`, with `current` to move on turn `turn`, for
+    player `player` by heuristic `heu` (which may read only masks and counts,
+    as h1 and h3 do). Scored from both sides so the estimate is zero sum, then
+    squashed by a sigmoid into (-1, 1)."""
+    state = BitGamestate(current, turn)
+    state.masks = masks
+    state.counts = {clr: mask.bit_count() for (clr, mask) in masks.items()}
+    diff = heu(state, player) - heu(state, player.opponent)
+    return 2 / (1 + exp(-diff / SCALE)) - 1
+
+def delta_score(own: int, other: int, id: int) -> float:
+    """Scores placement id `id` for the player with token mask `own` against
+    the opponent's mask `other`, from the placement mask alone: tokens gained
+    on the opponent, a bonus per line cleared, and the air neighbour 
+    difference after the move (air before the move is the same for every
+    placement, so is left out)."""
+    own |= PLACEMENT_MASKS[id]
+    occupied = own | other
+    clear = 0
+    lines = 0
+    for line in LINE_MASKS[id]:
+        if occupied & line == line: 
+            clear |= line
+            lines += 1
+
+    gained = PIECE_N
+    if clear:
+        gained += (other & clear).bit_count() - (own & clear).bit_count()
+        own &= ~clear
+        other &= ~clear
+        occupied &= ~clear
+    air = (spread(own) & ~occupied).bit_count() - \
+        (spread(other) & ~occupied).bit_count()
+    return gained + CLEAR_BONUS * lines + AIR * air
+
+
+class RandomPolicy:
+    """Playout policy picking uniformly random legal placements."""
+
+    def choose(self, masks: dict[PlayerColor, int], color: PlayerColor
+               ) -> int | None:
+        """Returns the id of a placement for `color` given token masks
+        `masks`, None if there are no legal placements."""
+        other = masks[color.opponent]
+        return random_placement(masks[color], masks[color] | other)
+
+class GreedyPolicy:
+    """Epsilon-greedy playout policy. Plays a random legal placement with 
+    chance `epsilon`, otherwise the best by delta_score() of `samples` random
+    legal placements (or of every legal placement if `samples` is None)."""
+    epsilon: float
+    samples: int | None
+
+    def __init__(self, epsilon: float = EPSILON, samples: int | None = SAMPLES):
+        self.epsilon = epsilon
+        self.samples = samples
+
+    def choose(self, masks: dict[PlayerColor, int], color: PlayerColor
+               ) -> int | None:
+        """Returns the id of a placement for `color` given token masks
+        `masks`, None if there are no legal placements."""
+        own = masks[color]
+        other = masks[color.opponent]
+        occupied = own | other
+        if random() < self.epsilon: return random_placement(own, occupied)
+
+        if self.samples is None:
+            ids = frontier_placements(spread(own) & ~occupied, occupied)
+        else:
+            ids = {random_placement(own, occupied) for _ in range(self.samples)}
+            ids.discard(None)
+        if not ids: return None
+        return max(ids, key=lambda id: delta_score(own, other, id))
+
+RANDOM = RandomPolicy()
+
+
+def playout(game: BitGamestate, horizon: int | None = None, heu = None,
+            policy: RandomPolicy | GreedyPolicy = RANDOM, 
+            moves: list[int] | None = None) -> Number:
+    """Plays moves picked by `policy` from `game` on a scratch copy of its 
+    masks until the game ends. Returns the outcome for the player to move in
+    `game`: 1 if win, -1 if loss, 0 if draw (by token count once MAX_TURNS is
+    reached). 
+    If `horizon` is given, stops after that many moves and returns an estimate
+    of the outcome by heuristic `heu` instead, a float within (-1, 1).
+    Placement ids played are appended to `moves` if given."""
+    masks = game.masks.copy()
+    current = game.current
+    turn = game.turn
+    # Game ends once MAX_TURNS moves have been made, on turn MAX_TURNS + 1
+    end = MAX_TURNS + 1
+    if horizon is not None: end = min(turn + horizon, end)
+
+    while turn < end:
+        id = policy.choose(masks, current)
+        # Player to move loses if no moves left
+        if id == None:
+            return -1 if current == game.current else 1
+
+        place(masks, id, current)
+        if moves is not None: moves.append(id)
+        current = current.opponent
+        turn += 1
+
+    if turn <= MAX_TURNS:
+        return estimate(masks, current, turn, game.current, heu)
+
+    # Calculate winner by tile count here - bound between [-1,1]
+    diff = masks[game.current].bit_count() - \
+        masks[game.current.opponent].bit_count()
+    return min(max(diff, -1), 1)
@@ -1,9 +1,11 @@
 """program.py: Supplies an `Agent` class to play Tetress in competition with 
 another agent. Managed by the referee module.
 Agent selects next move depending on game stage (evaluated via next possible 
-moves count) - either via an alpha-Beta pruned search algorithm paired with 
-heuristics to find next optimal path, or a straightforward greedy evaluation of
-next best move using heuristics at base depth."""
+moves count) - either via an iteratively deepened principal variation (alpha-
+Beta pruned negamax) search algorithm paired with heuristics to find next 
+optimal path, given a share of the CPU time remaining each turn, or a 
+straightforward greedy evaluation of next best move using heuristics at base 
+depth."""
 
 __author__ = "Liam Anthian, and Anthony Hill"
 __credits__ = ["Liam Anthian", "Anthony Hill"] 
@@ -12,11 +14,20 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # Project Part B: Game Playing Agent
 
 # === Imports ===
+from concurrent.futures import ProcessPoolExecutor
 from math import inf
+from multiprocessing import get_context
+from multiprocessing.sharedctypes import Synchronized
+from numbers import Number
+from time import perf_counter, process_time
 
-from .control import first_move, possible_moves
-from .gamestate import Gamestate, flatten_board
+from .control import first_move, turn_time_slice
+from .bitgamestate import BitGamestate
 from .heuristics import *
+from .ordering import MoveOrdering
+from .placements import PLACEMENTS
+from .quiescence import quiesce
+from .transposition import EXACT, LOWER, UPPER, TranspositionTable
 from .valwrap import ValWrap
 
 from referee.game import Action, PlayerColor, MAX_TURNS
@@ -25,7 +36,16 @@ from referee.game import Action, PlayerColor, MAX_TURNS
 WIN = 10000
 LOSS = -WIN
 THRESHOLD = 15
-DEPTH = 3
+AB_THRESHOLD = 4 * THRESHOLD    # most moves to use a-B over greedy search at
+MAX_DEPTH = 12          # deepest iteration of iterative deepening
+ASPIRATION = 8          # half width of root window about the last score
+LATE_MOVES = 4          # moves searched before quiet moves are reduced
+LMR_DEPTH = 3           # least depth to reduce late moves at
+FUTILITY = (0, 10, 30)  # margin over a static score by depth, to depth 2
+WORKERS = 0             # processes to split root moves over, 0 for none
+
+class SearchTimeout(Exception):
+    """For when a search runs past its deadline."""
 
 class Agent:
     """
@@ -34,17 +54,44 @@ class Agent:
     """
     first_move: bool
     color: PlayerColor
-    seen: dict[str: list[Action]]
+    tt: TranspositionTable              # search results, by Gamestate hash
+    ab_tt: TranspositionTable | None    # ab() results, made on first ab() call
+    clock: 'function'                   # timer of searches, in seconds
+    deadline: float | None              # clock() time to stop searching at
+    ordering: MoveOrdering              # killer and history tables
+    nodes: int                          # search nodes visited, for comparison
+    workers: int                        # root search processes, 0 for none
+    pool: ProcessPoolExecutor | None    # root search workers, if any
+    alpha: Synchronized | None          # best root score, shared with workers
 
-    def __init__(self, color: PlayerColor, **referee: dict):
+    def __init__(self, color: PlayerColor, workers: int = WORKERS, 
+                 **referee: dict):
         """
         This constructor method runs when the referee instantiates the agent.
-        All setup and/or precomputation is done here.
+        All setup and/or precomputation is done here. Starts `workers` root
+        search processes if more than 0.
         """
         self.first_move =True
         self.color = color
-        self.game = Gamestate()
-        self.seen = {}
+        self.game = BitGamestate()
+        self.tt = TranspositionTable()
+        self.ab_tt = None
+        self.deadline = None
+        self.ordering = MoveOrdering()
+        self.nodes = 0
+
+        # Workers' CPU time isn't this process's, so time their searches by 
+        # wall clock instead
+        self.clock = process_time if workers == 0 else perf_counter
+        self.workers = workers
+        self.pool = self.alpha = None
+        if workers > 0:
+            # Forking would copy the referee's stream overrides into workers
+            context = get_context("forkserver")
+            self.alpha = context.Value('d', -inf)
+            self.pool = ProcessPoolExecutor(workers, context,
+                                            initializer=_init_worker,
+                                            initargs=(self.alpha,))
 
     def action(self, **referee: dict) -> Action:
         """
@@ -57,15 +104,14 @@ class Agent:
             return first_move(self.game.board)
         
         else:
-            # Intelligently select next move if few remaning possible moves
-            moves = possible_moves(self.game.board, self.color)
-            # above calculation is doubled up at times, but << efficiency change
-
-            if len(moves) < THRESHOLD:
-                # Possible moves below threshold, use a-B
-                return ab(self, DEPTH, h2)
-            
+            # Intelligently select next move if few remaning possible moves - 
+            # searching as deep as this turn's share of time allows
+            if self.game.mobility(self.color) < AB_THRESHOLD:
+                move = iterative_pvs(self, h2, turn_time_slice(self.game, referee))
+                if move is not None: return move
+
             # Otherwise, greedy pick based on heuristic
+            moves = self.game.legal_moves(self.color)
             return greedy(self.game, self.color, moves)
 
     def update(self, color: PlayerColor, action: Action, **referee: dict):
@@ -76,11 +122,10 @@ class Agent:
         # There is only one action type, PlaceAction. 
         # Clear filled lines as necessary.
         self.game.move(action, color)
+        # Transposition table is of fixed size - no clearing of past states
 
-        # Could implement a method to clear past seen to free space here...
 
-
-def greedy(game: Gamestate, player: PlayerColor, 
+def greedy(game: BitGamestate, player: PlayerColor, 
            moves: list[Action]) -> Action:
     """Greedy search with heuristics. Searches through a precalculated list of 
     possible next moves `moves` and returns the most promising move according
@@ -91,9 +136,10 @@ def greedy(game: Gamestate, player: PlayerColor,
     h_combined = h_combiner([(h1, 1/8), (h3, 1)])
 
     for move in moves:
-        child = game.child(move, player)
-        # h = multi_h([(h1, 1/8), (h3, 1)], child, self.color)
-        h = h_combined(child, player)
+        # Evaluate move in place, reverting it after
+        game.push(move)
+        h = h_combined(game, player)
+        game.pop()
         # Maximise h here
         if h > best:
             best = h
@@ -101,28 +147,62 @@ def greedy(game: Gamestate, player: PlayerColor,
     return best_move
 
 
+def iterative_pvs(agt: Agent, heu, time_slice: float) -> Action | None:
+    """Iterative deepening driver around pvs(). Searches depth 1, 2, 3, ... 
+    until `time_slice` seconds (of `agt.clock`) have passed, with best moves of
+    each iteration kept in the transposition table to be searched first by the
+    next, and each iteration's score centring the next's aspiration window.
+    Returns the best Action of the last completed iteration, None if none."""
+    clock = agt.clock
+    start = clock()
+    agt.deadline = start + time_slice
+    agt.ordering.age()
+    base = len(agt.game.history)
+    last = min(MAX_DEPTH, MAX_TURNS - agt.game.turn + 1)
+
+    best, score = None, None
+    try:
+        for depth in range(1, last + 1):
+            if agt.pool is None: (best, score) = pvs(agt, depth, heu, score)
+            else:
+                (best, score) = parallel_pvs(agt, depth, heu, 
+                                             agt.deadline - clock())
+            # Next iteration costs at least double this one - won't complete
+            if clock() - start > time_slice / 2: break
+    except SearchTimeout:
+        # Revert moves left applied by the abandoned iteration
+        while len(agt.game.history) > base: agt.game.pop()
+    finally:
+        agt.deadline = None
+    return best
+
 def ab(agt: Agent, depth: int, heu) -> Action | None:
     """The origin point for an alpha-beta pruning minimax approach to searching
     through next possible moves for a gamestate `agt.game`. Remaining max 
     recursions are determined from `depth`, and bottom nodes are evaluated 
     according to the heuristic `heu` for optimal color `agt.color`.
-    Returns an Action, None if depth too shallow or no possible moves."""
+    Returns an Action, None if depth too shallow or no possible moves.
+    Kept alongside pvs() to compare the two."""
     # Can't search less than 1
     if depth <= 0: return None
+    # Scores are from the agent's side, so kept apart from pvs()'s table
+    if agt.ab_tt is None: agt.ab_tt = TranspositionTable()
 
     a = ValWrap(-inf, None)
     b = ValWrap(inf, None)
     return sub_ab(True, agt.game, None, agt.color, depth, heu, agt, a, b).item
 
-def sub_ab(max_flag: bool, game: Gamestate, move: Action, player: PlayerColor, 
-           depth: int, heu, agt: Agent, a: ValWrap, b: ValWrap) -> ValWrap:
+def sub_ab(max_flag: bool, game: BitGamestate, move: Action, 
+           player: PlayerColor, depth: int, heu, agt: Agent, a: ValWrap, 
+           b: ValWrap) -> ValWrap:
     """ab() sub-function. Maximises or minimises outcome depending on 
     alternating depth level. Equivalent to ab_max if `max_flag` is set to True, 
     ab_min if set to False. Returns a ValWrap-ed Action."""
+    agt.nodes += 1
     # -- Check cutoff states --
     if depth == 0:
-        # Bottom reached
-        return ValWrap(heu(game, player), move)
+        # Bottom reached - settle any line clears before evaluating
+        return ValWrap(quiesce(game, player, heu, a.val, b.val), move)
     
     if game.turn > MAX_TURNS:
         # Last move was final turn - player with most tokens wins
@@ -131,38 +211,250 @@ def sub_ab(max_flag: bool, game: Gamestate, move: Action, player: PlayerColor,
         else: return ValWrap(LOSS, move)
 
     else: 
-        # Find next level of the tree of possible states
-        flat_b = flatten_board(game.board)
-        # Avoid recalculating possible moves by storing game state in `seen`
-        if flat_b not in agt.seen: 
-            agt.seen[flat_b] = possible_moves(game.board, game.current)
-        next_moves = agt.seen[flat_b]
+        # Abandon search if past the turn's deadline
+        if agt.deadline is not None and agt.clock() > agt.deadline:
+            raise SearchTimeout()
+
+        # Reuse an earlier search of this state if deep enough - except at the
+        # root, where a move must still be found
+        entry = agt.ab_tt.probe(game.hash)
+        hash_move = None
+        if entry is not None:
+            (tt_depth, score, bound, hash_move) = entry
+            if tt_depth >= depth and move != None:
+                if bound == EXACT: return ValWrap(score, move)
+                if bound == LOWER and score >= b.val: return b
+                if bound == UPPER and score <= a.val: return a
+
+        # Count next level of the tree of possible states
+        n_moves = game.mobility(game.current)
 
         # If no moves remaining, reflect this WIN/LOSS from player's perspective
-        if len(next_moves) == 0:
+        if n_moves == 0:
             if game.current == player: return ValWrap(LOSS, move)
             else: return ValWrap(WIN, move)
         
         # or, if notably >> threshold again and any move has been uncovered, cut 
         # a-B search short at this depth - FAILSAFE against expensive search
-        elif (len(next_moves) > 5 * THRESHOLD * depth) and (move != None):
+        elif (n_moves > 5 * THRESHOLD * depth) and (move != None):
             return ValWrap(heu(game, player), move)
 
+        # Search moves most likely to cause a cutoff first
+        next_moves = agt.ordering.order(game, hash_move)
 
         # Otherwise, proceed with max/min value search depending on turn
+        a_val, b_val = a.val, b.val
+        best = None
         for p in next_moves:
-            s = game.child(p,game.current)
+            # Walk down the tree in place, reverting move once searched
+            game.push(p)
             m = p if (move == None) else move
 
             # Update maximum possible outcome if flag true
             if max_flag:
-                a = max(a, sub_ab(False, s, m, player, depth-1, heu, agt, a, b))
-                if a.val >= b.val: return b
+                s = sub_ab(False, game, m, player, depth-1, heu, agt, a, b)
+                if s > a: a, best = s, p
             # Update minimum possible outcome if flag false
             else:
-                b =  min(b, sub_ab(True, s, m, player, depth-1, heu, agt, a, b))
-                if b.val <= a.val: return a
+                s = sub_ab(True, game, m, player, depth-1, heu, agt, a, b)
+                if s < b: b, best = s, p
+            game.pop()
+
+            if max_flag and a.val >= b.val: 
+                agt.ordering.cutoff(game, p, depth)
+                agt.ab_tt.store(game.hash, depth, a.val, LOWER, p.id)
+                return b
+            if not max_flag and b.val <= a.val: 
+                agt.ordering.cutoff(game, p, depth)
+                agt.ab_tt.store(game.hash, depth, b.val, UPPER, p.id)
+                return a
+
+        # Return a / b if no turnover, storing whether either was improved on
+        if max_flag: 
+            if best is None: 
+                agt.ab_tt.store(game.hash, depth, a_val, UPPER, None)
+            else: agt.ab_tt.store(game.hash, depth, a.val, EXACT, best.id)
+            return a
+        else: 
+            if best is None: 
+                agt.ab_tt.store(game.hash, depth, b_val, LOWER, None)
+            else: agt.ab_tt.store(game.hash, depth, b.val, EXACT, best.id)
+            return b
+
+
+def pvs(agt: Agent, depth: int, heu, guess: Number | None = None
+        ) -> tuple[Action | None, Number]:
+    """The origin point for a principal variation search (negamax form of 
+    alpha-Beta) of next possible moves for gamestate `agt.game`, evaluating
+    bottom nodes with heuristic `heu`. Searches within an aspiration window
+    about `guess` (last iteration's score) if given, widening it on a fail.
+    Returns the best Action and its score, (None, 0) if depth too shallow."""
+    # Can't search less than 1
+    if depth <= 0: return (None, 0)
+
+    if guess is None or abs(guess) >= WIN: (a, b) = (-inf, inf)
+    else: (a, b) = (guess - ASPIRATION, guess + ASPIRATION)
+    while True:
+        (score, move) = sub_pvs(agt.game, depth, heu, agt, a, b)
+        # Score fell outside the window - only a bound, so search again
+        if score <= a: a = -inf
+        elif score >= b: b = inf
+        else: return (move, score)
+
+def sub_pvs(game: BitGamestate, depth: int, heu, agt: Agent, a: Number, 
+            b: Number) -> tuple[Number, Action | None]:
+    """pvs() sub-function. Scores `game` from the perspective of the player to
+    move within window (`a`, `b`) - fail soft, so scores outside the window 
+    bound the true score. The first (best ordered) move is searched with the 
+    full window and the rest with a null window, searching again only if one 
+    turns out better. Late quiet moves are searched shallower, and those near
+    the horizon skipped if futile. Returns the score and best Action found.
+    Transposition table scores are kept from the player to move's perspective,
+    unlike sub_ab() - which keeps its own table, `agt.ab_tt`."""
+    agt.nodes += 1
+    # -- Check cutoff states --
+    if depth == 0:
+        # Bottom reached - settle any line clears before evaluating
+        return (quiesce(game, game.current, heu, a, b), None)
+    
+    if game.turn > MAX_TURNS:
+        # Last move was final turn - player with most tokens wins
+        if game.counts[game.current] > game.counts[game.current.opponent]:
+            return (WIN, None)
+        else: return (LOSS, None)
+
+    # Abandon search if past the turn's deadline
+    if agt.deadline is not None and agt.clock() > agt.deadline:
+        raise SearchTimeout()
+
+    # Reuse an earlier search of this state if deep enough
+    entry = agt.tt.probe(game.hash)
+    hash_move = None
+    if entry is not None:
+        (tt_depth, score, bound, hash_move) = entry
+        if tt_depth >= depth and hash_move is not None:
+            if (bound == EXACT or (bound == LOWER and score >= b) or 
+                (bound == UPPER and score <= a)):
+                return (score, PLACEMENTS[hash_move])
+
+    # If no moves remaining, the player to move has lost
+    if game.mobility(game.current) == 0: return (LOSS, None)
+
+    a_val = a
+    best, best_move = -inf, None
+    for (i, p) in enumerate(agt.ordering.staged(game, hash_move)):
+        # Moves after the first that clear no lines are unlikely to be best
+        quiet = i > 0 and not game.completes_line(p.id)
+
+        # Walk down the tree in place, reverting move once searched
+        game.push(p)
+
+        # Futility pruning - near the horizon, skip quiet moves whose static 
+        # score even plus a margin can't raise a
+        if quiet and depth < len(FUTILITY):
+            s = -heu(game, game.current) + FUTILITY[depth]
+            if s <= a:
+                game.pop()
+                best = max(best, s)
+                continue
+
+        if i == 0:
+            s = -sub_pvs(game, depth-1, heu, agt, -b, -a)[0]
+        else:
+            # Late move reductions - search late quiet moves shallower, and 
+            # again at full depth only if one beats a
+            r = 0
+            if quiet and i >= LATE_MOVES and depth >= LMR_DEPTH:
+                r = 1 if i < 4 * LATE_MOVES else 2
+            s = -sub_pvs(game, depth-1-r, heu, agt, -a-1, -a)[0]
+            if r and s > a:
+                s = -sub_pvs(game, depth-1, heu, agt, -a-1, -a)[0]
+
+            # Only prove p no better than the best so far, unless it is
+            if a < s < b:
+                s = -sub_pvs(game, depth-1, heu, agt, -b, -s)[0]
+        game.pop()
+
+        if s > best: best, best_move = s, p
+        if s > a: a = s
+        if a >= b:
+            agt.ordering.cutoff(game, p, depth)
+            break
+
+    # Store whether the score is exact or only bounds the true score
+    if best <= a_val: bound = UPPER
+    elif best >= b: bound = LOWER
+    else: bound = EXACT
+    agt.tt.store(game.hash, depth, best, bound, best_move.id)
+    return (best, best_move)
+
+
+def parallel_pvs(agt: Agent, depth: int, heu, time_slice: float
+                 ) -> tuple[Action | None, Number]:
+    """Root parallel version of pvs(). Deals the ordered root moves of 
+    `agt.game` out between the worker processes of `agt.pool`, which search
+    them to `depth` within `time_slice` seconds each, sharing the best root 
+    score found so far as alpha. Returns the best Action and its score.
+    Raises a SearchTimeout if any worker ran out of time."""
+    game = agt.game
+    ids = [p.id for p in agt.ordering.order(game, agt.tt.best_move(game.hash))]
+    if len(ids) == 0: return (None, LOSS)
+
+    # Deal moves round robin, so every worker starts on a promising move
+    agt.alpha.value = -inf
+    n = agt.workers
+    tasks = [agt.pool.submit(_search_moves, game, ids[i::n], depth, heu, 
+                             time_slice) for i in range(min(n, len(ids)))]
+    results = [task.result() for task in tasks]
+    agt.nodes += sum(nodes for (_, _, nodes, _, _) in results)
+    if not all(done for (_, _, _, done, _) in results): raise SearchTimeout()
+
+    # Merge workers' best moves, keeping the best for the next iteration. 
+    # Shared alpha only ever holds exact scores, so moves failing low scored
+    # no better than the best exact score - which is then the root's score
+    (score, id, _, _, exact) = max(results, key=lambda result: 
+                                   (result[4], result[0]))
+    agt.tt.store(game.hash, depth, score, EXACT if exact else UPPER, id)
+    return (PLACEMENTS[id], score)
+
+def _init_worker(alpha: Synchronized):
+    """Sets up a root search worker process, sharing best root score `alpha`.
+    Each worker keeps its own search tables between tasks."""
+    global _worker, _alpha
+    _worker = Agent(PlayerColor.RED, workers=0)
+    _worker.clock = perf_counter
+    _alpha = alpha
+
+def _search_moves(game: BitGamestate, ids: list[int], depth: int, heu, 
+                  time_slice: float
+                  ) -> tuple[Number, int | None, int, bool, bool]:
+    """Worker task of parallel_pvs(). Searches root placement ids `ids` of 
+    `game` to `depth`, raising the shared alpha as better moves are found. 
+    Returns the best score and placement id, nodes visited, whether all
+    moves were searched within `time_slice` seconds, and whether the best 
+    score is exact (rather than an upper bound, if every move failed low)."""
+    agt = _worker
+    agt.nodes = 0
+    agt.deadline = agt.clock() + time_slice
+    best, best_id, exact = -inf, None, False
+    try:
+        for id in ids:
+            # Only a score above every worker's best so far matters
+            a = max(best if exact else -inf, _alpha.value)
+            game.push(PLACEMENTS[id])
+            s = -sub_pvs(game, depth-1, heu, agt, -inf, -a)[0]
+            game.pop()
 
-        # Return a / b if no turnover
-        if max_flag: return a
-        else: return b
+            if s > a:
+                # Within the window - an exact score
+                best, best_id, exact = s, id, True
+                with _alpha.get_lock():
+                    if s > _alpha.value: _alpha.value = s
+            elif not exact and (best_id is None or s > best):
+                # Failed low - only an upper bound, kept if nothing better
+                best, best_id = s, id
+    except SearchTimeout:
+        return (best, best_id, agt.nodes, False, exact)
+    finally:
+        agt.deadline = None
+    return (best, best_id, agt.nodes, True, exact)
@@ -0,0 +1,61 @@
+"""quiescence.py: Implements a quiescence search to extend the bottom nodes of a
+fixed depth search. Line clears swing token counts sharply, so rather than
+evaluating a state midway through an exchange of clears, only line clearing
+placements are searched further until the state is quiet (or a depth cap)."""
+
+__author__ = "Liam Anthian"
+__credits__ = ["Liam Anthian", "Anthony Hill"]
+
+# COMP30024 Artificial Intelligence, Semester 1 2024
+# Project Part B: Game Playing Agent
+
+# === Imports ===
+from math import inf
+from numbers import Number
+
+from .bitgamestate import BitGamestate
+from .ordering import clear_gains
+from .placements import PLACEMENTS
+
+from referee.game import PlayerColor
+
+# === Constants ===
+QS_DEPTH = 4            # most line clears searched past the bottom node
+QS_WIDTH = 3            # most line clears searched from each state
+
+
+def quiesce(game: BitGamestate, player: PlayerColor, heu, a: Number = -inf,
+            b: Number = inf, depth: int = QS_DEPTH) -> Number:
+    """Scores `game` from the perspective of player `player` with heuristic
+    `heu`, searching line clearing placements to at most `depth` more moves
+    within window (`a`, `b`). The player to move may always decline to clear
+    (stand pat), so the static score bounds their result."""
+    stand = heu(game, player)
+    if depth == 0: return stand
+
+    # Player maximises score, opponent minimises it
+    maximise = game.current == player
+    if maximise:
+        if stand >= b: return stand
+        a = max(a, stand)
+    else:
+        if stand <= a: return stand
+        b = min(b, stand)
+
+    # Extend only the clears taking the most tokens, and more than they lose
+    gains = clear_gains(game)
+    best = stand
+    for id in sorted(gains, key=gains.get, reverse=True)[:QS_WIDTH]:
+        # Walk down the tree in place, reverting move once searched
+        game.push(PLACEMENTS[id])
+        s = quiesce(game, player, heu, a, b, depth-1)
+        game.pop()
+
+        if maximise:
+            best = max(best, s)
+            a = max(a, s)
+        else:
+            best = min(best, s)
+            b = min(b, s)
+        if a >= b: break
+    return best
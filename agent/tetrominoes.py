@@ -7,7 +7,9 @@ __credits__ = ["Liam Anthian", "Anthony Hill"]
 # COMP30024 Artificial Intelligence, Semester 1 2024
 # Project Part B: Single Player Tetress
 
-from referee.game import Coord, Direction, PlaceAction
+from referee.game import Coord, PlaceAction
+from .bitboard import cell_id, coords_mask
+from .placements import ADJACENT, PLACEMENTS, PLACEMENT_MASKS, free_placements
 
 def tetrominoes(
         c: Coord,
@@ -25,40 +27,11 @@ def tetrominoes(
     
     Returns:
         A list of lists of Coords (list of place actions) or in the case that 
-            starting coordinate is present in `avoid_coord` list, and empty list
+            starting coordinate is present in `tiles` set, an empty list
     """
-    t = []
-
-    # Safety check if no possible tetrominos to generate from starting coord
-    if c in tiles: return t
-
-    in_progress = [[c]]
-    seen = []
-    # Work through a queue of semi-assembled tetrominoes to build whole set
-    while len(in_progress) > 0:
-        curr = in_progress.pop(0)
-        curr.sort()     # ensures each piece+place is always defined the same
-        # Skip node if already seen
-        if curr in seen:
-            continue
-
-        # otherwise, add to seen set and check if valid
-        else:
-            seen.append(curr)
-            if len(curr) == 4:
-                # valid tetromino - convert to PlaceAction
-                t.append(PlaceAction(curr[0],curr[1],curr[2],curr[3]))
-                continue
-        
-        # Loop through each direction for each piece, attaching a new block
-        for coord in curr:
-            for dir in [d.value for d in Direction]:
-                new = Coord.__add__(coord, dir)
-                # Avoid duplicating existing and including disallowed coords
-                if (new in curr) or (new in tiles): continue
-                in_progress.append(curr + [new])
-
-    return t
+    # Placements are looked up from the precomputed table (see placements.py)
+    occupied = coords_mask(tiles)
+    return [PLACEMENTS[id] for id in free_placements(cell_id(c), occupied)]
 
 
 def tetrominoes_plus(
@@ -71,16 +44,8 @@ def tetrominoes_plus(
     (empty by default) to check if neighbouring cells are already filled and 
     shorten calculation.
     """
-    t = []
-
     # Disinclude middle coord to form pattern
-    if c not in tiles: tiles.add(c)
-
-    for dir in [d.value for d in Direction]:
-        new = Coord.__add__(c, dir)
-
-        # Add surrounding tetrominoes, omitting centre tile, and dropping dups
-        t += ([t1 for t1 in tetrominoes(new, tiles) if t1 not in t])
-        # (1*s, 1*z, 1*l, 1*j, 2*t) * 4 = 24 dropped as dup (if `tiles` empty)
+    occupied = coords_mask(tiles) | (1 << cell_id(c))
 
-    return t
+    return [PLACEMENTS[id] for id in ADJACENT[cell_id(c)]
+            if not PLACEMENT_MASKS[id] & occupied]
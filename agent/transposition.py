@@ -0,0 +1,70 @@
+"""transposition.py: Implements a fixed capacity transposition table to store
+search results of previously seen game states, keyed by Gamestate hash."""
+
+__author__ = "Liam Anthian"
+__credits__ = ["Liam Anthian", "Anthony Hill"]
+
+# COMP30024 Artificial Intelligence, Semester 1 2024
+# Project Part B: Game Playing Agent
+
+# === Imports ===
+from numbers import Number
+
+# === Constants ===
+# Bound types of a stored score
+EXACT = 0
+LOWER = 1               # score is a lower bound (search failed high)
+UPPER = 2               # score is an upper bound (search failed low)
+
+
+class TranspositionTable:
+    """
+    A hash table of fixed capacity storing (depth, score, bound, best move)
+    entries for searched game states. Each bucket holds two entries: one kept
+    for the deepest search seen for the bucket, and one always replaced by the
+    newest search, so memory use never grows over a game.
+    """
+    size: int                       # buckets, a power of 2
+    entries: list[tuple | None]     # (key, depth, score, bound, move) pairs
+
+    def __init__(self, bits: int = 15):
+        """Creates an empty table of 2^`bits` buckets (2^(`bits`+1) entries)."""
+        self.size = 1 << bits
+        self.entries = [None] * (2 * self.size)
+
+    def probe(self, key: int) -> tuple[int, Number, int, int | None] | None:
+        """Returns the stored (depth, score, bound, best move id) of hash `key`,
+        or None if not stored. The deeper of two matching entries is used."""
+        i = (key & (self.size - 1)) << 1
+        deep = self.entries[i]
+        if deep is not None and deep[0] == key:
+            return deep[1:]
+        new = self.entries[i + 1]
+        if new is not None and new[0] == key:
+            return new[1:]
+        return None
+
+    def store(self, key: int, depth: int, score: Number, bound: int,
+              move: int | None):
+        """Stores a search result for hash `key`. Replaces the depth-preferred
+        entry if as deep or deeper (or of the same state), demoting the old
+        entry to the always-replace slot, otherwise the always-replace entry."""
+        i = (key & (self.size - 1)) << 1
+        entry = (key, depth, score, bound, move)
+        deep = self.entries[i]
+        if deep is None or deep[0] == key:
+            self.entries[i] = entry
+        elif depth >= deep[1]:
+            self.entries[i + 1] = deep
+            self.entries[i] = entry
+        else:
+            self.entries[i + 1] = entry
+
+    def best_move(self, key: int) -> int | None:
+        """Returns the stored best move id of hash `key`, if any."""
+        entry = self.probe(key)
+        return entry[3] if entry is not None else None
+
+    def clear(self):
+        """Empties the table of all entries."""
+        self.entries = [None] * (2 * self.size)
@@ -0,0 +1,45 @@
+"""zobrist.py: Provides Zobrist hashing of Tetress board states. Each (color,
+cell) pair is assigned a random 64 bit key, and a state's hash is the XOR of the
+keys of all its tokens, plus a side-to-move key when blue is to play. Placing or
+clearing a token toggles its key, so hashes can be updated incrementally."""
+
+__author__ = "Liam Anthian"
+__credits__ = ["Liam Anthian", "Anthony Hill"]
+
+# COMP30024 Artificial Intelligence, Semester 1 2024
+# Project Part B: Game Playing Agent
+
+# === Imports ===
+from random import Random
+
+from .bitboard import CELLS, mask_cells
+
+from referee.game import PlayerColor
+
+# === Constants ===
+SEED = 30024            # fixed so that hashes agree between processes
+
+
+def _keys() -> tuple[tuple[tuple[int, ...], ...], int]:
+    """Generates the Zobrist keys from a fixed seed."""
+    rng = Random(SEED)
+    keys = tuple(tuple(rng.getrandbits(64) for _ in range(CELLS))
+                 for _ in PlayerColor)
+    return keys, rng.getrandbits(64)
+
+# Key of a token of a given color (indexed by PlayerColor) on a given cell id
+KEYS, SIDE = _keys()
+
+
+def side_hash(current: PlayerColor) -> int:
+    """Returns the side-to-move part of a hash, `current` being next to play."""
+    return SIDE if current == PlayerColor.BLUE else 0
+
+def mask_hash(mask: int, color: PlayerColor) -> int:
+    """Returns the XOR of the keys of every cell of bitmask `mask` holding a
+    token of `color`."""
+    keys = KEYS[color]
+    h = 0
+    for cell in mask_cells(mask):
+        h ^= keys[cell]
+    return h
@@ -6,7 +6,7 @@ from dataclasses import dataclass
 from typing import AsyncGenerator
 
 from .constants import *
-from .coord import Coord, Direction
+from .coord import Coord, Direction, COORDS, NEIGHBOURS
 from .player import Player
 from .board import Board, PlayerColor
 from .actions import Action, PlaceAction
@@ -1,9 +1,10 @@
 # COMP30024 Artificial Intelligence, Semester 1 2024
 # Project Part B: Game Playing Agent
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from .coord import Coord
+from .pieces import PLACEMENT_COORDS, PLACEMENT_IDS
 
 
 @dataclass(frozen=True, slots=True)
@@ -11,18 +12,66 @@ class PlaceAction():
     """
     A dataclass representing a "place action", where four board coordinates
     denote the placement of a tetromino piece.
+
+    On construction the coords are cached along with their bitmask (bit
+    `coord.id` set for each coord) and canonical placement `id`, which is None
+    if the coords do not form a valid placement. Valid actions are hashed and
+    compared by placement id, regardless of the order of their coords.
     """
     c1: Coord
     c2: Coord
     c3: Coord
     c4: Coord
 
-    @property
-    def coords(self) -> set[Coord]:
+    id: int | None = field(init=False, repr=False, compare=False)
+    mask: int = field(init=False, repr=False, compare=False)
+    _coords: frozenset[Coord] | None = field(init=False, repr=False, 
+                                             compare=False)
+
+    def __post_init__(self):
         try:
-            return set([self.c1, self.c2, self.c3, self.c4])
-        except:
+            coords = frozenset([self.c1, self.c2, self.c3, self.c4])
+        except TypeError:
+            coords = None
+
+        mask = 0
+        if coords is not None and all(type(c) == Coord for c in coords):
+            for coord in coords:
+                mask |= 1 << coord.id
+
+        object.__setattr__(self, "_coords", coords)
+        object.__setattr__(self, "mask", mask)
+        object.__setattr__(self, "id", PLACEMENT_IDS.get(mask))
+
+    @classmethod
+    def from_id(cls, id: int) -> 'PlaceAction':
+        """
+        Return the (shared) place action with placement id `id`.
+        """
+        return _PLACE_ACTIONS[id]
+
+    @property
+    def coords(self) -> frozenset[Coord]:
+        if self._coords is None:
             raise AttributeError("Invalid coords")
+        return self._coords
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PlaceAction):
+            return NotImplemented
+        if self.id is not None:
+            return self.id == other.id
+        return (self.c1, self.c2, self.c3, self.c4) == \
+            (other.c1, other.c2, other.c3, other.c4)
+
+    def __hash__(self) -> int:
+        if self.id is not None:
+            return self.id
+        return hash((self.c1, self.c2, self.c3, self.c4))
+
+    def __reduce__(self):
+        # Only the coords need sending; cached fields are rebuilt on arrival
+        return (PlaceAction, (self.c1, self.c2, self.c3, self.c4))
 
     def __str__(self) -> str:
         try:
@@ -31,4 +80,7 @@ class PlaceAction():
             return f"PLACE(<invalid coords>)"
 
 
+# Place actions of every placement id, shared by PlaceAction.from_id
+_PLACE_ACTIONS = tuple(PlaceAction(*coords) for coords in PLACEMENT_COORDS)
+
 Action = PlaceAction
@@ -4,7 +4,7 @@
 from dataclasses import dataclass
 
 from .pieces import Piece, PieceType, create_piece
-from .coord import Coord, Direction
+from .coord import Coord, NEIGHBOURS
 from .player import PlayerColor
 from .actions import Action, PlaceAction
 from .exceptions import IllegalActionException
@@ -269,8 +269,7 @@ class Board:
                     self._turn_color)
         
     def _has_neighbour(self, coord: Coord, color: PlayerColor) -> bool:
-        for direction in Direction:
-            neighbour = coord + direction
+        for neighbour in NEIGHBOURS[coord.id]:
             if self._state[neighbour].player == color:
                 return True
         return False
@@ -95,30 +95,74 @@ class Direction(Enum):
                 return super().__getattribute__(__name)
 
 
+class _InternedCoord(type):
+    """
+    Metaclass returning shared, precomputed `Coord` instances for in-bounds
+    coordinates (see `COORDS`), so that constructing or offsetting a coord does
+    not allocate. Out-of-bounds coordinates fall through to the usual checks.
+    """
+    def __call__(cls, r: int, c: int) -> 'Coord':
+        if type(r) is int and type(c) is int \
+                and 0 <= r < BOARD_N and 0 <= c < BOARD_N:
+            return COORDS[r * BOARD_N + c]
+        return super().__call__(r, c)
+
+
 @dataclass(order=True, frozen=True)
-class Coord(Vector2):
+class Coord(Vector2, metaclass=_InternedCoord):
     """
     A specialisation of the `Vector2` class, representing a coordinate on the
     game board. This class also enforces that the coordinates are within the
     bounds of the game board, or in the case of addition/subtraction, using
     modulo arithmetic to "wrap" the coordinates at the edges of the board.
+
+    Instances are interned: each coordinate is a single shared object carrying
+    an integer cell `id` (r * BOARD_N + c), which is also its hash.
     """
 
     def __post_init__(self):
         if not (0 <= self.r < BOARD_N) or not (0 <= self.c < BOARD_N):
             raise ValueError(f"Out-of-bounds coordinate: {self}")
 
+    def __hash__(self) -> int:
+        return self.id
+
+    def __reduce__(self):
+        # Re-intern on unpickling rather than building a new instance
+        return (Coord, (self.r, self.c))
+
     def __str__(self):
         return f"{self.r}-{self.c}"
 
     def __add__(self, other: 'Direction|Vector2') -> 'Coord':
-        return self.__class__(
-            (self.r + other.r) % BOARD_N, 
-            (self.c + other.c) % BOARD_N,
-        )
+        return COORDS[
+            ((self.r + other.r) % BOARD_N) * BOARD_N + 
+            (self.c + other.c) % BOARD_N
+        ]
 
     def __sub__(self, other: 'Direction|Vector2') -> 'Coord':
-        return self.__class__(
-            (self.r - other.r) % BOARD_N, 
+        return COORDS[
+            ((self.r - other.r) % BOARD_N) * BOARD_N + 
             (self.c - other.c) % BOARD_N
-        )
+        ]
+
+
+def _intern_coords() -> tuple[Coord, ...]:
+    """
+    Build every in-bounds coord once, bypassing the interning metaclass.
+    """
+    coords = []
+    for r in range(BOARD_N):
+        for c in range(BOARD_N):
+            coord = type.__call__(Coord, r, c)
+            object.__setattr__(coord, "id", len(coords))
+            coords.append(coord)
+    return tuple(coords)
+
+# Shared coord instances, indexed by cell id
+COORDS: tuple[Coord, ...] = _intern_coords()
+
+# The four neighbouring coords of each cell id, in `Direction` order
+NEIGHBOURS: tuple[tuple[Coord, ...], ...] = tuple(
+    tuple(coord + direction for direction in Direction) for coord in COORDS
+)
@@ -237,3 +237,26 @@ def create_piece(
     return Piece(
         [origin + offset for offset in _TEMPLATES[piece_type]]
     )
+
+
+def _placement_table() -> tuple[tuple[tuple[Coord, ...], ...], dict[int, int]]:
+    """
+    Enumerate every distinct placement of a piece on the board: each of the
+    nineteen piece types at each origin cell. Placement ids are assigned piece
+    type by piece type (in `PieceType` order), then by origin cell id, i.e.
+    `id = type_index * BOARD_N * BOARD_N + origin.id`.
+    """
+    placements = []
+    ids = {}
+    for piece_type in PieceType:
+        for r in range(BOARD_N):
+            for c in range(BOARD_N):
+                piece = create_piece(piece_type, Coord(r, c))
+                coords = tuple(sorted(piece.coords))
+                ids[sum(1 << coord.id for coord in coords)] = len(placements)
+                placements.append(coords)
+    return tuple(placements), ids
+
+# Sorted coords of each placement id, and the placement id of each bitmask of
+# four coords (bit `coord.id` set for each coord) that forms a placement
+PLACEMENT_COORDS, PLACEMENT_IDS = _placement_table()